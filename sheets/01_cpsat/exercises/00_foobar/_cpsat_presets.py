@@ -0,0 +1,113 @@
+"""
+Named parameter presets for CP-SAT and a small benchmark runner to compare them.
+This file is identical in all exercises of this sheet.
+
+- "default": CP-SAT's defaults with the search log enabled (as before).
+- "throughput": one worker per CPU core, no log. Best for proving optimality
+  of hard instances.
+- "latency": a few workers and the search stops as soon as the solution is
+  within 0.1% of the bound. Best for quickly getting good solutions.
+- "deterministic": a single worker with a fixed seed, such that repeated runs
+  yield the same result (e.g., for debugging and reproducible measurements).
+"""
+
+import csv
+import math
+import os
+from typing import Any, Callable, Dict, Iterable, List, Optional
+
+from ortools.sat.python.cp_model import CpSolver
+
+PRESETS: Dict[str, Dict[str, Any]] = {
+    "default": {"log_search_progress": True},
+    "throughput": {
+        "num_workers": os.cpu_count() or 8,
+        "log_search_progress": False,
+    },
+    "latency": {
+        "num_workers": min(os.cpu_count() or 1, 4),
+        "relative_gap_limit": 0.001,
+        "log_search_progress": False,
+    },
+    "deterministic": {
+        "num_workers": 1,
+        "random_seed": 0,
+        "log_search_progress": False,
+    },
+}
+
+
+def configure_solver(
+    solver: CpSolver, preset: str = "default", **overrides: Any
+) -> CpSolver:
+    """
+    Apply the parameters of a preset (and further parameter overrides) to a solver.
+    """
+    if preset not in PRESETS:
+        msg = f"Unknown preset '{preset}'! Available presets: {sorted(PRESETS)}"
+        raise ValueError(msg)
+    for name, value in {**PRESETS[preset], **overrides}.items():
+        setattr(solver.parameters, name, value)
+    return solver
+
+
+def make_solver(preset: str = "default", **overrides: Any) -> CpSolver:
+    """
+    Create a new CpSolver configured with the given preset.
+    """
+    return configure_solver(CpSolver(), preset, **overrides)
+
+
+def run_benchmark(
+    solve: Callable[[str, str, float], CpSolver],
+    instances: Iterable[str],
+    presets: Iterable[str] = tuple(PRESETS),
+    timelimit: float = 60.0,
+    repetitions: int = 1,
+    csv_path: Optional[str] = None,
+) -> List[Dict[str, Any]]:
+    """
+    Solve every instance with every preset and record the solve time of the runs
+    that CP-SAT reported as OPTIMAL (inf if the time limit was hit). The time is
+    `CpSolver.WallTime()`, such that building the model does not count. Note that
+    "latency" reports OPTIMAL once the solution is within its relative gap limit.
+
+    :param solve: Gets the instance path, the preset and the time limit, solves the
+        instance and returns the CpSolver that was used.
+    """
+    rows = []
+    presets = list(presets)
+    for instance in instances:
+        for preset in presets:
+            for repetition in range(repetitions):
+                try:
+                    solver = solve(instance, preset, timelimit)
+                    # StatusName() without an argument fails with OR-Tools 9.15
+                    status = solver.StatusName(solver.ResponseProto().status)
+                    objective = solver.ObjectiveValue()
+                    bound = solver.BestObjectiveBound()
+                    runtime = solver.WallTime()
+                except AssertionError:  # the exercise solvers assert optimality
+                    status = "UNKNOWN"
+                    objective, bound, runtime = math.nan, math.nan, math.inf
+                row = {
+                    "instance": os.path.basename(instance),
+                    "preset": preset,
+                    "repetition": repetition,
+                    "status": status,
+                    "objective": objective,
+                    "bound": bound,
+                    "time_to_optimal": runtime if status == "OPTIMAL" else math.inf,
+                }
+                print(
+                    f"{row['instance']:>20} {preset:>14} #{repetition}:"
+                    f" objective {objective}, bound {bound},"
+                    f" time to optimal {row['time_to_optimal']:.2f}s"
+                )
+                rows.append(row)
+    if csv_path is not None:
+        with open(csv_path, "w", newline="") as f:
+            writer = csv.DictWriter(f, fieldnames=list(rows[0]) if rows else [])
+            writer.writeheader()
+            writer.writerows(rows)
+    return rows
@@ -1,8 +1,16 @@
+from typing import Optional
+
+from _cpsat_presets import make_solver
+from _cpsat_telemetry import SearchTelemetry
 from data_schema import Instance, Solution
 from ortools.sat.python import cp_model
 
 
-def solve(instance: Instance) -> Solution:
+def solve(
+    instance: Instance,
+    preset: str = "default",
+    telemetry: Optional[SearchTelemetry] = None,
+) -> Solution:
     numbers = instance.numbers
     model = cp_model.CpModel()
     max_distance = model.NewIntVar(
@@ -20,8 +28,10 @@ def solve(instance: Instance) -> Solution:
     )
     model.Maximize(max_distance)
 
-    solver = cp_model.CpSolver()
-    status = solver.Solve(model)
+    solver = make_solver(preset)
+    if telemetry is not None:
+        telemetry.attach(solver)
+    status = solver.Solve(model, telemetry)
     assert status == cp_model.OPTIMAL
     print(solver.SolutionInfo())
     print(solver.ResponseStats())
@@ -2,10 +2,10 @@ from data_schema import Instance, Solution
 
 
 def solve(instance: Instance) -> Solution:
-    instance.numbers.sort()
-    numbers = instance.numbers
+    # a single pass, without sorting (and modifying) the instance
+    lower, upper = min(instance.numbers), max(instance.numbers)
     return Solution(
-        number_a=numbers[0],
-        number_b=numbers[-1],
-        distance=abs(numbers[0] - numbers[-1]),
+        number_a=lower,
+        number_b=upper,
+        distance=upper - lower,
     )
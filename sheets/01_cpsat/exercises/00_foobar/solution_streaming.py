@@ -0,0 +1,107 @@
+"""
+A streaming solver for number lists that are too large for an `Instance`.
+The largest distance is always between the minimum and the maximum, so a single
+pass that keeps the running minimum and maximum suffices. The numbers are read in
+chunks, which are reduced with NumPy, so the memory usage does not depend on the
+number of numbers.
+
+Supported inputs are NumPy arrays (including memory-mapped ones), raw binary files
+of fixed-size integers, and text files with whitespace-separated integers:
+
+    python solution_streaming.py numbers.txt
+    python solution_streaming.py numbers.bin --dtype int32
+"""
+
+import argparse
+from typing import Iterable, Optional, Tuple
+
+import numpy as np
+from data_schema import Solution
+
+CHUNK_SIZE = 1 << 22  # numbers per chunk
+
+
+def _reduce(chunks: Iterable[np.ndarray]) -> Solution:
+    lower: Optional[int] = None
+    upper: Optional[int] = None
+    for chunk in chunks:
+        if chunk.size == 0:
+            continue
+        chunk_min, chunk_max = int(chunk.min()), int(chunk.max())
+        lower = chunk_min if lower is None else min(lower, chunk_min)
+        upper = chunk_max if upper is None else max(upper, chunk_max)
+    if lower is None or upper is None:
+        msg = "Cannot select two numbers from an empty list."
+        raise ValueError(msg)
+    return Solution(number_a=lower, number_b=upper, distance=upper - lower)
+
+
+def _chunks(numbers: np.ndarray, chunk_size: int) -> Iterable[np.ndarray]:
+    for start in range(0, len(numbers), chunk_size):
+        yield numbers[start : start + chunk_size]
+
+
+def solve_array(numbers: np.ndarray, chunk_size: int = CHUNK_SIZE) -> Solution:
+    """
+    Solve for a one-dimensional array of integers. The array is processed in chunks,
+    such that memory-mapped arrays are never loaded into memory completely.
+    """
+    return _reduce(_chunks(np.asarray(numbers).ravel(), chunk_size))
+
+
+def solve_binary_file(
+    path: str, dtype: str = "int64", offset: int = 0, chunk_size: int = CHUNK_SIZE
+) -> Solution:
+    """
+    Solve for a raw binary file of integers of the given dtype (e.g., written with
+    `numpy.ndarray.tofile`), starting at the given byte offset.
+    """
+    numbers = np.memmap(path, dtype=np.dtype(dtype), mode="r", offset=offset)
+    return solve_array(numbers, chunk_size)
+
+
+def _parse_text(block: bytes) -> np.ndarray:
+    block = block.strip()  # NumPy parses a whitespace-only string as [0]
+    return np.fromstring(block, dtype=np.int64, sep=" ") if block else np.empty(0)
+
+
+def _text_chunks(path: str, chunk_bytes: int) -> Iterable[np.ndarray]:
+    with open(path, "rb") as f:
+        rest = b""
+        while block := f.read(chunk_bytes):
+            block = rest + block
+            # the last number may continue in the next block
+            cut = max(block.rfind(b" "), block.rfind(b"\n"), block.rfind(b"\t"))
+            if cut < 0:
+                rest = block
+                continue
+            block, rest = block[:cut], block[cut:]
+            yield _parse_text(block)
+        yield _parse_text(rest)
+
+
+def solve_text_file(path: str, chunk_size: int = CHUNK_SIZE) -> Solution:
+    """
+    Solve for a text file with whitespace-separated integers.
+    """
+    return _reduce(_text_chunks(path, chunk_bytes=8 * chunk_size))
+
+
+def _parse_args() -> Tuple[str, Optional[str]]:
+    parser = argparse.ArgumentParser(
+        description="Find the largest distance between two numbers in a file."
+    )
+    parser.add_argument("path", help="a text file or a raw binary file of integers")
+    parser.add_argument(
+        "--dtype", help="the integer type of a binary file, e.g., int32 or int64"
+    )
+    args = parser.parse_args()
+    return args.path, args.dtype
+
+
+if __name__ == "__main__":
+    path, dtype = _parse_args()
+    if dtype is None:
+        print(solve_text_file(path))
+    else:
+        print(solve_binary_file(path, dtype))
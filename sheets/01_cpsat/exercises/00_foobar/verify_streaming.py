@@ -0,0 +1,64 @@
+import os
+import random
+import tempfile
+
+import numpy as np
+from _alglab_utils import CHECK, main, mandatory_testcase
+from solution_streaming import solve_array, solve_binary_file, solve_text_file
+
+
+def check_solution(solution, numbers):
+    CHECK(solution.number_a in numbers, "The first number is not in the list.")
+    CHECK(solution.number_b in numbers, "The second number is not in the list.")
+    CHECK(
+        solution.distance == max(numbers) - min(numbers),
+        "The distance is not optimal.",
+    )
+
+
+@mandatory_testcase(max_runtime_s=10)
+def array_test():
+    random.seed(42)
+    numbers = [random.randint(-100, 100) for _ in range(1000)]
+    # small chunks to test the reduction over several chunks
+    check_solution(solve_array(np.array(numbers), chunk_size=7), numbers)
+
+
+@mandatory_testcase(max_runtime_s=10)
+def binary_file_test():
+    random.seed(42)
+    numbers = [random.randint(-(10**12), 10**12) for _ in range(1000)]
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        path = os.path.join(tmp_dir, "numbers.bin")
+        np.array(numbers, dtype=np.int64).tofile(path)
+        check_solution(solve_binary_file(path, "int64", chunk_size=13), numbers)
+
+
+@mandatory_testcase(max_runtime_s=10)
+def text_file_test():
+    random.seed(42)
+    numbers = [random.randint(-(10**12), 10**12) for _ in range(1000)]
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        path = os.path.join(tmp_dir, "numbers.txt")
+        with open(path, "w") as f:
+            # numbers will be split at chunk boundaries
+            f.write(
+                "\n".join(
+                    " ".join(map(str, numbers[i : i + 9])) for i in range(0, 1000, 9)
+                )
+            )
+            f.write("\n\n")
+        check_solution(solve_text_file(path, chunk_size=5), numbers)
+
+
+@mandatory_testcase(max_runtime_s=10)
+def single_number_test():
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        path = os.path.join(tmp_dir, "numbers.txt")
+        with open(path, "w") as f:
+            f.write(" -7 ")
+        check_solution(solve_text_file(path), [-7])
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,200 @@
+"""
+Structured telemetry for CP-SAT runs, as an alternative to reading the search log.
+This file is identical in all exercises of this sheet.
+
+A `SearchTelemetry` is attached to a CpSolver and passed as solution callback to
+`Solve`. It records every improving solution and every bound improvement over time,
+and extracts the presolve statistics from the log. After the solve, `record()`
+summarizes the run as a `SearchRecord`, which can be exported to JSON or CSV.
+
+    telemetry = SearchTelemetry()
+    solver = MultiKnapsackSolver(instance, telemetry=telemetry)
+    solver.solve()
+    export_json([telemetry.record("10i_1k")], "telemetry.json")
+"""
+
+import csv
+import json
+import re
+import time
+from typing import Dict, Iterable, List, Optional
+
+from ortools.sat import cp_model_pb2
+from ortools.sat.python.cp_model import CpSolver, CpSolverSolutionCallback
+from pydantic import BaseModel, Field
+
+
+class ProgressEvent(BaseModel):
+    """
+    A new solution ("solution") or a new objective bound ("bound") at some time.
+    """
+
+    kind: str
+    wall_time: float
+    value: float
+
+
+class PresolveStats(BaseModel):
+    """
+    The size of the model before and after presolve, and the time spent in presolve.
+    """
+
+    presolve_time: Optional[float] = None
+    variables_before: Optional[int] = None
+    variables_after: Optional[int] = None
+    constraints_before: Optional[int] = None
+    constraints_after: Optional[int] = None
+
+
+class SearchRecord(BaseModel):
+    """
+    The summary of a single CP-SAT run.
+    """
+
+    name: str = ""
+    status: str
+    objective: Optional[float] = None
+    bound: Optional[float] = None
+    wall_time: float
+    deterministic_time: float
+    num_conflicts: int
+    num_branches: int
+    time_to_first_solution: Optional[float] = Field(
+        None, description="None if no solution was found."
+    )
+    time_to_optimal: Optional[float] = Field(
+        None, description="None if optimality was not proven."
+    )
+    presolve: PresolveStats
+    events: List[ProgressEvent]
+
+
+_STARTING_PRESOLVE = re.compile(r"Starting presolve at ([\d.]+)s")
+_STARTING_SEARCH = re.compile(r"Starting search at ([\d.]+)s")
+_NUM_VARIABLES = re.compile(r"^#Variables: ([\d']+)", re.MULTILINE)
+_NUM_CONSTRAINTS = re.compile(r"^#k\w+: ([\d']+)", re.MULTILINE)
+
+
+def _parse_int(text: str) -> int:
+    return int(text.replace("'", ""))  # CP-SAT uses ' as thousands separator
+
+
+class SearchTelemetry(CpSolverSolutionCallback):
+    """
+    Records the search progress of the CpSolver it is attached to.
+    The search log is captured via the log callback and only printed if the solver
+    was configured to log to stdout anyway.
+    """
+
+    def __init__(self) -> None:
+        super().__init__()
+        self._solver: Optional[CpSolver] = None
+        self._start = time.perf_counter()
+        self.events: List[ProgressEvent] = []
+        self.presolve = PresolveStats()
+        self._presolve_start: Optional[float] = None
+
+    def attach(self, solver: CpSolver) -> "SearchTelemetry":
+        """
+        Install the bound and log callbacks on the solver.
+        """
+        self._solver = solver
+        if not solver.parameters.log_search_progress:
+            solver.parameters.log_search_progress = True
+            solver.parameters.log_to_stdout = False
+        solver.log_callback = self._on_log
+        solver.best_bound_callback = self._on_bound
+        return self
+
+    def _elapsed(self) -> float:
+        return time.perf_counter() - self._start
+
+    def _on_log(self, message: str) -> None:
+        if message.startswith("Starting CP-SAT solver"):
+            # a new solve: reset the recorded progress
+            self._start = time.perf_counter()
+            self.events = []
+            self.presolve = PresolveStats()
+            self._presolve_start = None
+        elif match := _STARTING_PRESOLVE.match(message):
+            self._presolve_start = float(match.group(1))
+        elif match := _STARTING_SEARCH.match(message):
+            if self._presolve_start is not None:
+                self.presolve.presolve_time = (
+                    float(match.group(1)) - self._presolve_start
+                )
+        elif message.startswith(
+            ("Initial optimization model", "Presolved optimization model")
+        ):
+            match = _NUM_VARIABLES.search(message)
+            variables = _parse_int(match.group(1)) if match else None
+            constraints = sum(_parse_int(n) for n in _NUM_CONSTRAINTS.findall(message))
+            if message.startswith("Initial"):
+                self.presolve.variables_before = variables
+                self.presolve.constraints_before = constraints
+            else:
+                self.presolve.variables_after = variables
+                self.presolve.constraints_after = constraints
+
+    def _on_bound(self, bound: float) -> None:
+        self.events.append(
+            ProgressEvent(kind="bound", wall_time=self._elapsed(), value=bound)
+        )
+
+    def on_solution_callback(self) -> None:
+        self.add_solution(self.ObjectiveValue())
+
+    def add_solution(self, objective: float) -> None:
+        """
+        Record a solution. Only needed if the solve used another solution callback.
+        """
+        self.events.append(
+            ProgressEvent(kind="solution", wall_time=self._elapsed(), value=objective)
+        )
+
+    def record(self, name: str = "") -> SearchRecord:
+        """
+        Summarize the last solve of the attached solver.
+        """
+        assert self._solver is not None, "The telemetry was never attached to a solver."
+        response = self._solver.ResponseProto()
+        status = cp_model_pb2.CpSolverStatus.Name(response.status)
+        solutions = [e.wall_time for e in self.events if e.kind == "solution"]
+        has_solution = status in ("OPTIMAL", "FEASIBLE")
+        return SearchRecord(
+            name=name,
+            status=status,
+            objective=response.objective_value if has_solution else None,
+            bound=response.best_objective_bound if has_solution else None,
+            wall_time=response.wall_time,
+            deterministic_time=response.deterministic_time,
+            num_conflicts=response.num_conflicts,
+            num_branches=response.num_branches,
+            time_to_first_solution=solutions[0] if solutions else None,
+            time_to_optimal=response.wall_time if status == "OPTIMAL" else None,
+            presolve=self.presolve.model_copy(),
+            events=list(self.events),
+        )
+
+
+def export_json(records: Iterable[SearchRecord], path: str) -> None:
+    """
+    Write the full records, including all progress events, to a JSON file.
+    """
+    with open(path, "w") as f:
+        json.dump([record.model_dump() for record in records], f, indent=2)
+
+
+def export_csv(records: Iterable[SearchRecord], path: str) -> None:
+    """
+    Write one row per record to a CSV file. The progress events are omitted.
+    """
+    rows: List[Dict[str, object]] = []
+    for record in records:
+        row = record.model_dump(exclude={"events", "presolve"})
+        row.update(record.presolve.model_dump())
+        rows.append(row)
+    with open(path, "w", newline="") as f:
+        writer = csv.DictWriter(f, fieldnames=list(rows[0]) if rows else [])
+        writer.writeheader()
+        writer.writerows(rows)
@@ -0,0 +1,172 @@
+"""
+Preprocessing for large multi-knapsack instances. Items with identical weight and
+value are interchangeable, as are knapsacks with identical capacity. Modelling every
+(knapsack, item) pair with its own Boolean creates a huge number of symmetric
+solutions, which CP-SAT has to rule out during the search. Instead, we
+
+- group identical items and only decide how many items of each group go into a knapsack,
+- drop items that do not fit into any knapsack,
+- optionally order knapsacks of equal capacity lexicographically by their packed
+  group counts. This is off by default, as CP-SAT detects these symmetries itself and
+  the reified lexicographic constraints slowed down the search in our experiments.
+
+The result is expanded back into a regular `Solution` of `Item`s.
+"""
+
+import math
+from collections import defaultdict
+from typing import Dict, List, Optional, Tuple
+
+from _cpsat_presets import make_solver
+from _cpsat_telemetry import SearchTelemetry
+from data_schema import Instance, Item, Solution
+from ortools.sat.python.cp_model import (
+    FEASIBLE,
+    OPTIMAL,
+    CpModel,
+    IntVar,
+    LinearExpr,
+)
+
+
+class ItemGroup:
+    """
+    A group of items with identical weight and value.
+    """
+
+    def __init__(self, weight: int, value: int, items: List[Item]) -> None:
+        self.weight = weight
+        self.value = value
+        self.items = items
+
+    def __len__(self) -> int:
+        return len(self.items)
+
+
+def group_items(instance: Instance) -> List[ItemGroup]:
+    """
+    Group the items of the instance by (weight, value). Items that are heavier than
+    the largest knapsack can never be packed and are dropped.
+    """
+    max_capacity = max(instance.capacities, default=0)
+    groups: Dict[Tuple[int, int], List[Item]] = defaultdict(list)
+    for item in instance.items:
+        if item.weight <= max_capacity:
+            groups[item.weight, item.value].append(item)
+    return [
+        ItemGroup(weight, value, items) for (weight, value), items in groups.items()
+    ]
+
+
+def add_lexicographic_greater_equal(
+    model: CpModel, a: List[IntVar], b: List[IntVar]
+) -> None:
+    """
+    Enforce that the vector a is lexicographically greater or equal than b.
+    `prefix_equal` is true if all previous entries of a and b are equal, in which
+    case the current entry of a must not be smaller than the one of b.
+    """
+    assert len(a) == len(b), "Vectors must have the same length."
+    prefix_equal = None  # always true for the first entry
+    for k, (a_k, b_k) in enumerate(zip(a, b)):
+        constraint = model.Add(a_k >= b_k)
+        if prefix_equal is not None:
+            constraint.OnlyEnforceIf(prefix_equal)
+        if k == len(a) - 1:
+            break
+        equal = model.NewBoolVar("")
+        model.Add(a_k == b_k).OnlyEnforceIf(equal)
+        model.Add(a_k != b_k).OnlyEnforceIf(equal.Not())
+        if prefix_equal is not None:
+            next_prefix_equal = model.NewBoolVar("")
+            model.AddBoolAnd([prefix_equal, equal]).OnlyEnforceIf(next_prefix_equal)
+            model.AddBoolOr([prefix_equal.Not(), equal.Not(), next_prefix_equal])
+            equal = next_prefix_equal
+        prefix_equal = equal
+
+
+class AggregatedMultiKnapsackSolver:
+    """
+    Solves the Multi-Knapsack problem on the aggregated instance, with one integer
+    variable per (knapsack, item group) counting the packed items of the group.
+    """
+
+    def __init__(
+        self,
+        instance: Instance,
+        symmetry_breaking: bool = False,
+        preset: str = "default",
+        telemetry: Optional[SearchTelemetry] = None,
+    ):
+        self.instance = instance
+        self.capacities = instance.capacities
+        self.groups = group_items(instance)
+        self.model = CpModel()
+        self.solver = make_solver(preset)
+        if telemetry is not None:
+            telemetry.attach(self.solver)
+        self.telemetry = telemetry
+
+        self.y = [
+            [
+                self.model.NewIntVar(
+                    0,
+                    min(len(group), capacity // group.weight)
+                    if group.weight > 0
+                    else len(group),
+                    "",
+                )
+                for group in self.groups
+            ]
+            for capacity in self.capacities
+        ]
+        weights = [group.weight for group in self.groups]
+        values = [group.value for group in self.groups]
+        for y_i, capacity in zip(self.y, self.capacities):
+            self.model.Add(LinearExpr.WeightedSum(y_i, weights) <= capacity)
+        for g, group in enumerate(self.groups):
+            self.model.Add(sum(y_i[g] for y_i in self.y) <= len(group))
+        self.model.Maximize(
+            LinearExpr.WeightedSum(
+                [y_ig for y_i in self.y for y_ig in y_i], values * len(self.capacities)
+            )
+        )
+        if symmetry_breaking:
+            self._break_knapsack_symmetries()
+
+    def _break_knapsack_symmetries(self) -> None:
+        """
+        Knapsacks with equal capacity can be permuted arbitrarily. Only allow the
+        permutation in which their group counts are lexicographically decreasing.
+        """
+        knapsacks_by_capacity = defaultdict(list)
+        for i, capacity in enumerate(self.capacities):
+            knapsacks_by_capacity[capacity].append(i)
+        for knapsacks in knapsacks_by_capacity.values():
+            for i, j in zip(knapsacks, knapsacks[1:]):
+                add_lexicographic_greater_equal(self.model, self.y[i], self.y[j])
+
+    def _expand_solution(self) -> Solution:
+        remaining = [list(group.items) for group in self.groups]
+        knapsacks = []
+        for y_i in self.y:
+            knapsack = []
+            for g, y_ig in enumerate(y_i):
+                for _ in range(self.solver.Value(y_ig)):
+                    knapsack.append(remaining[g].pop())
+            knapsacks.append(knapsack)
+        return Solution(knapsacks=knapsacks)
+
+    def solve(self, timelimit: float = math.inf) -> Solution:
+        """
+        Solve the aggregated instance with the given time limit and expand the
+        solution back to the original items.
+        """
+        if timelimit <= 0.0:
+            return Solution(knapsacks=[])  # empty solution
+        if timelimit < math.inf:
+            self.solver.parameters.max_time_in_seconds = timelimit
+        status = self.solver.Solve(self.model, self.telemetry)
+        if status not in (OPTIMAL, FEASIBLE):
+            return Solution(knapsacks=[[] for _ in self.capacities])
+        return self._expand_solution()
@@ -0,0 +1,51 @@
+"""
+Compare the CP-SAT presets on the instances of this exercise.
+
+    python benchmark.py --presets throughput deterministic --timelimit 30
+"""
+
+import argparse
+import glob
+import os
+
+from _cpsat_presets import PRESETS, run_benchmark
+from _cpsat_telemetry import SearchTelemetry, export_csv, export_json
+from instance_loader import load_instance
+from solution import MultiKnapsackSolver
+
+INSTANCE_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "instances")
+
+
+RECORDS = []
+
+
+def solve(path: str, preset: str, timelimit: float):
+    telemetry = SearchTelemetry()
+    solver = MultiKnapsackSolver(
+        load_instance(path), preset=preset, telemetry=telemetry
+    )
+    solver.solve(timelimit)
+    RECORDS.append(telemetry.record(f"{os.path.basename(path)}/{preset}"))
+    return solver.solver
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("instances", nargs="*", help="defaults to all instances")
+    parser.add_argument("--presets", nargs="+", default=list(PRESETS))
+    parser.add_argument("--timelimit", type=float, default=60.0)
+    parser.add_argument("--repetitions", type=int, default=1)
+    parser.add_argument("--csv", help="write the results to this CSV file")
+    parser.add_argument(
+        "--telemetry", help="write the search progress to this .json or .csv file"
+    )
+    args = parser.parse_args()
+    instances = args.instances or sorted(
+        glob.glob(os.path.join(INSTANCE_DIR, "*.json")), key=os.path.getsize
+    )
+    run_benchmark(
+        solve, instances, args.presets, args.timelimit, args.repetitions, args.csv
+    )
+    if args.telemetry:
+        export = export_csv if args.telemetry.endswith(".csv") else export_json
+        export(RECORDS, args.telemetry)
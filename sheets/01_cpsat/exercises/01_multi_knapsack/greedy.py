@@ -0,0 +1,73 @@
+from typing import List, Optional, Sequence
+
+from data_schema import Instance, Solution
+from instance_loader import column_data
+
+
+def greedy_assignment(
+    weights: Sequence[int], values: Sequence[int], capacities: Sequence[int]
+) -> List[Optional[int]]:
+    """
+    A best-fit-decreasing heuristic for the Multi-Knapsack problem: the items are
+    considered in decreasing order of their value/weight ratio and each item is
+    packed into the knapsack with the smallest remaining capacity that still fits it.
+    Returns the index of the knapsack for every item, or None if it is not packed.
+    """
+    remaining = list(capacities)
+    assignment: List[Optional[int]] = [None] * len(weights)
+    order = sorted(
+        range(len(weights)),
+        key=lambda j: values[j] / weights[j] if weights[j] > 0 else float("inf"),
+        reverse=True,
+    )
+    for j in order:
+        if values[j] <= 0:
+            continue  # packing does not improve the solution
+        fitting = [i for i, r in enumerate(remaining) if r >= weights[j]]
+        if not fitting:
+            continue
+        best_fit = min(fitting, key=lambda i: remaining[i])
+        remaining[best_fit] -= weights[j]
+        assignment[j] = best_fit
+    return assignment
+
+
+def fractional_upper_bound(
+    weights: Sequence[int], values: Sequence[int], capacities: Sequence[int]
+) -> float:
+    """
+    An upper bound for the Multi-Knapsack problem: the optimal value of the fractional
+    knapsack problem with all knapsacks merged into one, ignoring items that do not
+    fit into any knapsack.
+    """
+    max_capacity = max(capacities, default=0)
+    remaining = sum(capacities)
+    bound = 0.0
+    candidates = [
+        j for j in range(len(weights)) if values[j] > 0 and weights[j] <= max_capacity
+    ]
+    candidates.sort(
+        key=lambda j: values[j] / weights[j] if weights[j] > 0 else float("inf"),
+        reverse=True,
+    )
+    for j in candidates:
+        if weights[j] <= remaining:
+            bound += values[j]
+            remaining -= weights[j]
+        else:
+            bound += values[j] * remaining / weights[j]
+            break
+    return bound
+
+
+def greedy_multi_knapsack(instance: Instance) -> Solution:
+    """
+    Compute a feasible solution with the best-fit-decreasing heuristic.
+    """
+    weights, values = column_data(instance)
+    assignment = greedy_assignment(weights, values, instance.capacities)
+    knapsacks = [[] for _ in instance.capacities]
+    for j, i in enumerate(assignment):
+        if i is not None:
+            knapsacks[i].append(instance.items[j])
+    return Solution(knapsacks=knapsacks)
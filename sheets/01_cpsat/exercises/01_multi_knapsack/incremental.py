@@ -0,0 +1,219 @@
+"""
+An incremental variant of the MultiKnapsackSolver for items that arrive (and leave)
+over time. Instead of rebuilding the CP-SAT model for every change, the model is
+modified in place:
+
+- New items get new variables, which are appended to the capacity constraints
+  and the objective.
+- Removed items keep their variables, but these are fixed to zero.
+- Capacity changes only update the bound of the capacity constraint.
+
+Every solve is warm-started with the previous solution, repaired for the changes.
+"""
+
+import math
+from typing import Dict, Iterator, List, Optional, Sequence, Union, overload
+from uuid import UUID
+
+from _cpsat_telemetry import SearchTelemetry
+from data_schema import Instance, Item, Solution
+from instance_loader import ColumnarInstance
+from solution import MultiKnapsackSolver
+
+
+class _AppendableItems(Sequence[Item]):
+    """
+    The items of the instance followed by the added ones. The items of the instance
+    are not copied, such that the lazy items of a ColumnarInstance stay lazy.
+    """
+
+    def __init__(self, items: Sequence[Item]) -> None:
+        self._items = items
+        self._added: List[Item] = []
+
+    def __len__(self) -> int:
+        return len(self._items) + len(self._added)
+
+    @overload
+    def __getitem__(self, j: int) -> Item: ...
+
+    @overload
+    def __getitem__(self, j: slice) -> List[Item]: ...
+
+    def __getitem__(self, j: Union[int, slice]) -> Union[Item, List[Item]]:
+        if isinstance(j, slice):
+            return [self[k] for k in range(*j.indices(len(self)))]
+        if j < 0:
+            j += len(self)
+        if j < len(self._items):
+            return self._items[j]
+        return self._added[j - len(self._items)]
+
+    def __iter__(self) -> Iterator[Item]:
+        yield from self._items
+        yield from self._added
+
+    def append(self, item: Item) -> None:
+        self._added.append(item)
+
+
+class IncrementalMultiKnapsackSolver(MultiKnapsackSolver):
+    """
+    A MultiKnapsackSolver whose items and capacities can be changed between solves.
+    """
+
+    def __init__(
+        self,
+        instance: Instance,
+        named_variables: bool = False,
+        preset: str = "default",
+        telemetry: Optional[SearchTelemetry] = None,
+    ):
+        super().__init__(
+            instance,
+            named_variables=named_variables,
+            preset=preset,
+            telemetry=telemetry,
+        )
+        self._named_variables = named_variables
+        # items are appended, do not modify the instance
+        self.items = _AppendableItems(self.items)
+        # the items of a ColumnarInstance are found by their id, all others by _index
+        self._columnar = instance if isinstance(instance, ColumnarInstance) else None
+        self._index: Dict[UUID, int] = (
+            {}
+            if self._columnar is not None
+            else {item.id: j for j, item in enumerate(self.items)}
+        )
+        self._removed = set()
+
+    def _find(self, item: Item) -> Optional[int]:
+        """
+        The index of the item in the model, or None if it was never added.
+        """
+        if self._columnar is not None:
+            j = self._columnar.item_index(item)
+            if 0 <= j < len(self._columnar.items) and self.items[j].id == item.id:
+                return j
+        return self._index.get(item.id)
+
+    def _ratio(self, j: int) -> float:
+        return self.values[j] / self.weights[j] if self.weights[j] > 0 else math.inf
+
+    def _loads(self) -> List[int]:
+        loads = [0] * len(self.capacities)
+        for weight, i in zip(self.weights, self.warm_start):
+            if i is not None:
+                loads[i] += weight
+        return loads
+
+    def _refill(self) -> None:
+        """
+        Pack unpacked items into the free capacity of the warm start, in decreasing
+        order of value/weight ratio and each into the tightest fitting knapsack.
+        """
+        remaining = [
+            capacity - load for capacity, load in zip(self.capacities, self._loads())
+        ]
+        unpacked = [
+            j
+            for j, i in enumerate(self.warm_start)
+            if i is None and j not in self._removed and self.values[j] > 0
+        ]
+        unpacked.sort(key=self._ratio, reverse=True)
+        for j in unpacked:
+            fitting = [i for i, r in enumerate(remaining) if r >= self.weights[j]]
+            if fitting:
+                best_fit = min(fitting, key=lambda i: remaining[i])
+                remaining[best_fit] -= self.weights[j]
+                self.warm_start[j] = best_fit
+
+    def _repair(self, i: int) -> None:
+        """
+        Remove the items with the worst value/weight ratio from knapsack i of the
+        warm start, until it respects its capacity again.
+        """
+        packed = [j for j, k in enumerate(self.warm_start) if k == i]
+        packed.sort(key=self._ratio)
+        load = sum(self.weights[j] for j in packed)
+        for j in packed:
+            if load <= self.capacities[i]:
+                break
+            self.warm_start[j] = None
+            load -= self.weights[j]
+
+    def add_item(self, item: Item) -> None:
+        """
+        Add a new item to the model.
+        """
+        if self._find(item) is not None:
+            msg = f"Item {item.id} is already part of the model."
+            raise ValueError(msg)
+        j = len(self.items)
+        self.items.append(item)
+        self.weights.append(item.weight)
+        self.values.append(item.value)
+        self._index[item.id] = j
+        proto = self.model.Proto()
+        # CP-SAT stores a maximization objective as negated minimization
+        sign = -1 if proto.objective.scaling_factor < 0 else 1
+        x_j = []
+        for i, constraint in enumerate(self._capacity_constraints):
+            self.x[i, j] = self.model.NewBoolVar(
+                f"x_{i}_{j}" if self._named_variables else ""
+            )
+            x_j.append(self.x[i, j])
+            linear = proto.constraints[constraint.Index()].linear
+            linear.vars.append(self.x[i, j].Index())
+            linear.coeffs.append(item.weight)
+            proto.objective.vars.append(self.x[i, j].Index())
+            proto.objective.coeffs.append(sign * item.value)
+        if len(self.capacities) > 1:
+            self.model.AddAtMostOne(x_j)
+        self.warm_start.append(None)
+        self._refill()
+
+    def remove_item(self, item: Item) -> None:
+        """
+        Remove an item from the model by fixing its variables to zero.
+        """
+        j = self._find(item)
+        if j is None or j in self._removed:
+            msg = f"Item {item.id} is not part of the model."
+            raise ValueError(msg)
+        self._removed.add(j)
+        proto = self.model.Proto()
+        for i in range(len(self.capacities)):
+            proto.variables[self.x[i, j].Index()].domain[1] = 0
+        self.warm_start[j] = None
+        self._refill()
+
+    def set_capacity(self, knapsack: int, capacity: int) -> None:
+        """
+        Change the capacity of the given knapsack.
+        """
+        self.capacities[knapsack] = capacity
+        constraint = self._capacity_constraints[knapsack]
+        self.model.Proto().constraints[constraint.Index()].linear.domain[1] = capacity
+        self._repair(knapsack)
+        self._refill()
+
+    def active_items(self) -> List[Item]:
+        """
+        The items that are currently part of the model.
+        """
+        return [item for j, item in enumerate(self.items) if j not in self._removed]
+
+    def solve(self, timelimit: float = math.inf) -> Solution:
+        """
+        Solve the current model, warm-started with the (repaired) previous solution.
+        """
+        if timelimit <= 0.0:
+            return super().solve(timelimit)
+        self._add_hints()
+        solution = super().solve(timelimit)
+        self.warm_start = [None] * len(self.items)
+        for i, knapsack in enumerate(solution.knapsacks):
+            for item in knapsack:
+                self.warm_start[self._find(item)] = i
+        return solution
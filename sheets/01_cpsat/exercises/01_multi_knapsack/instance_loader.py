@@ -0,0 +1,128 @@
+"""
+A fast loader for large multi-knapsack instance files.
+
+`Instance.from_dict` validates every item with pydantic and draws a random
+`uuid4()` for it, which dominates the load time of instances with many items.
+`load_instance` instead keeps weights and values as plain columns and assigns every
+item the deterministic id `UUID(int=j)`, its index in the file. `Item` objects are
+only created (without validation) when they are actually accessed, e.g., when a
+`Solution` is built from the packed items.
+
+Parsing uses `orjson` if it is installed. It is an optional dependency and not part
+of requirements.txt (`pip install orjson`); without it, the standard `json` module
+is used, which is slower but gives the same result.
+"""
+
+import json
+from typing import Dict, Iterator, List, Sequence, Tuple, Union, overload
+from uuid import UUID
+
+from data_schema import Instance, Item
+
+try:
+    import orjson
+except ImportError:  # optional, only faster
+    orjson = None
+
+
+class LazyItems(Sequence[Item]):
+    """
+    A read-only sequence of items, which are created on first access.
+    """
+
+    def __init__(self, weights: List[int], values: List[int]) -> None:
+        assert len(weights) == len(values), "Weights and values must match."
+        self._weights = weights
+        self._values = values
+        self._cache: Dict[int, Item] = {}
+
+    def __len__(self) -> int:
+        return len(self._weights)
+
+    @overload
+    def __getitem__(self, j: int) -> Item: ...
+
+    @overload
+    def __getitem__(self, j: slice) -> List[Item]: ...
+
+    def __getitem__(self, j: Union[int, slice]) -> Union[Item, List[Item]]:
+        if isinstance(j, slice):
+            return [self[k] for k in range(*j.indices(len(self)))]
+        if j < 0:
+            j += len(self)
+        if not 0 <= j < len(self):
+            msg = f"Item index {j} out of range."
+            raise IndexError(msg)
+        item = self._cache.get(j)
+        if item is None:
+            item = Item.model_construct(
+                value=self._values[j], weight=self._weights[j], id=UUID(int=j)
+            )
+            self._cache[j] = item
+        return item
+
+    def __iter__(self) -> Iterator[Item]:
+        for j in range(len(self)):
+            yield self[j]
+
+
+class ColumnarInstance:
+    """
+    A multi-knapsack instance with the item data stored column-wise.
+    It provides the same `items` and `capacities` as `Instance`, and additionally
+    the `weights` and `values` columns.
+    """
+
+    def __init__(
+        self, weights: List[int], values: List[int], capacities: List[int]
+    ) -> None:
+        self.weights = weights
+        self.values = values
+        self.capacities = capacities
+        self.items = LazyItems(weights, values)
+
+    @classmethod
+    def from_dict(cls, data: dict) -> "ColumnarInstance":
+        capacities = [t["capacity"] for t in data["knapsacks"]]
+        assert data["num_knapsacks"] == len(capacities), "The instance is invalid!"
+        items = data["items"]
+        assert data["num_items"] == len(items), "The instance is invalid!"
+        weights = [t["weight"] for t in items]
+        values = [t["value"] for t in items]
+        return cls(weights, values, capacities)
+
+    def item_index(self, item: Item) -> int:
+        """
+        The column index of an item of this instance.
+        """
+        return item.id.int
+
+    def to_instance(self) -> Instance:
+        """
+        Convert to a regular (validated) `Instance` with the same item ids.
+        """
+        return Instance(items=list(self.items), capacities=list(self.capacities))
+
+
+def load_instance(path: str) -> ColumnarInstance:
+    """
+    Load a multi-knapsack instance from a JSON file.
+    """
+    with open(path, "rb") as f:
+        raw = f.read()
+    data = orjson.loads(raw) if orjson is not None else json.loads(raw)
+    return ColumnarInstance.from_dict(data)
+
+
+def column_data(
+    instance: Union[Instance, ColumnarInstance],
+) -> Tuple[List[int], List[int]]:
+    """
+    The weights and values of the items of any instance, as lists.
+    """
+    if isinstance(instance, ColumnarInstance):
+        return list(instance.weights), list(instance.values)
+    return (
+        [item.weight for item in instance.items],
+        [item.value for item in instance.items],
+    )
@@ -1,9 +1,20 @@
 import itertools
+import logging
 import math
-from typing import List
+import time
+from typing import List, Optional
 
+from _cpsat_presets import make_solver
+from _cpsat_telemetry import SearchTelemetry
 from data_schema import Instance, Item, Solution
-from ortools.sat.python.cp_model import FEASIBLE, OPTIMAL, CpModel, CpSolver
+from greedy import fractional_upper_bound, greedy_assignment
+from instance_loader import column_data
+from ortools.sat.python.cp_model import (
+    FEASIBLE,
+    OPTIMAL,
+    CpModel,
+    LinearExpr,
+)
 
 
 class MultiKnapsackSolver:
@@ -19,35 +30,91 @@ class MultiKnapsackSolver:
     - solver (CpSolver): a CpSolver object representing the constraint programming solver.
     """
 
-    def __init__(self, instance: Instance):
+    def __init__(
+        self,
+        instance: Instance,
+        named_variables: bool = False,
+        preset: str = "default",
+        telemetry: Optional[SearchTelemetry] = None,
+    ):
         """
         Initialize the solver with the given Multi-Knapsack instance.
 
         Args:
         - instance (Instance): an Instance object representing the Multi-Knapsack instance.
+        - named_variables (bool): give the variables readable names (for debugging the model).
+            Anonymous variables are faster to create.
+        - preset (str): the CP-SAT parameter preset, see `_cpsat_presets.PRESETS`.
+        - telemetry (SearchTelemetry): optionally records the search progress.
         """
+        start = time.perf_counter()
+        # the build and solve statistics are logged, not printed
+        self._logger = logging.getLogger("MultiKnapsackSolver")
+        # a ColumnarInstance creates its items lazily, only the packed ones are needed
         self.items = instance.items
-        self.capacities = instance.capacities
+        self.weights, self.values = column_data(instance)
+        self.capacities = list(instance.capacities)
         self.model = CpModel()
-        self.solver = CpSolver()
-        self.solver.parameters.log_search_progress = True
+        self.solver = make_solver(preset)
+        if telemetry is not None:
+            telemetry.attach(self.solver)
+        self.telemetry = telemetry
         # TODO: Implement me!
+        weights, values = self.weights, self.values
+        num_items = len(self.items)
         self.x = {}
         for i in range(len(self.capacities)):
-            for j in range(len(self.items)):
-                self.x[i,j] = self.model.NewBoolVar(f"x_{i}{j}")
+            for j in range(num_items):
+                self.x[i,j] = self.model.NewBoolVar(f"x_{i}_{j}" if named_variables else "")
+        x = [[self.x[i, j] for j in range(num_items)] for i in range(len(self.capacities))]
 
         #Constraints for each knapsack's capacitie
-        for i in range(len(self.capacities)):
-            self.model.Add(sum(self.x[i,j] * self.items[j].weight for j in range(len(self.items))) <= self.capacities[i])
-        
-        #Constraint each item only packed in one
-        for j in range(len(self.items)):
-            self.model.Add(sum(self.x[i,j] for i in range(len(self.capacities))) <= 1)
-        
+        self._capacity_constraints = [
+            self.model.Add(LinearExpr.WeightedSum(x[i], weights) <= capacity)
+            for i, capacity in enumerate(self.capacities)
+        ]
+
+        #Constraint each item only packed in one (trivial for a single knapsack)
+        if len(self.capacities) > 1:
+            for j in range(num_items):
+                self.model.AddAtMostOne(x_i[j] for x_i in x)
+
         #Objective
-        self.model.Maximize(sum(sum(self.x[i,j] * self.items[j].value for j in range(len(self.items))) for i in range(len(self.capacities))))
+        self.model.Maximize(
+            LinearExpr.WeightedSum(
+                [x_ij for x_i in x for x_ij in x_i], values * len(self.capacities)
+            )
+        )
+
+        #Warm start: hint the greedy solution, which also serves as fallback
+        self.warm_start = greedy_assignment(weights, values, self.capacities)
+        self._add_hints()
+        self.build_time = time.perf_counter() - start
+        self.solve_time = 0.0
+        self.objective = 0
+        self.bound = math.inf
+        self.gap = math.inf
 
+    def _add_hints(self) -> None:
+        """
+        Hint the warm start assignment (knapsack index or None per item) to CP-SAT.
+        """
+        self.model.ClearHints()
+        for (i, j), x_ij in self.x.items():
+            self.model.AddHint(x_ij, self.warm_start[j] == i)
+
+    def _report(self, objective: int, bound: float) -> None:
+        self.objective = objective
+        self.bound = bound
+        self.gap = (bound - objective) / max(abs(objective), 1)
+        self._logger.info(
+            "Model built in %.3fs, solved in %.3fs. Objective: %d, bound: %s, gap: %.2f%%.",
+            self.build_time,
+            self.solve_time,
+            objective,
+            bound,
+            100 * self.gap,
+        )
 
     def solve(self, timelimit: float = math.inf) -> Solution:
         """
@@ -65,15 +132,33 @@ class MultiKnapsackSolver:
         elif timelimit < math.inf:
             self.solver.parameters.max_time_in_seconds = timelimit
         # TODO: Implement me!
-        status = self.solver.Solve(self.model)
+        status = self.solver.Solve(self.model, self.telemetry)
+        self.solve_time = self.solver.WallTime()
 
-        assert status == OPTIMAL
-        sol = []
-        for i in range(len(self.capacities)):
-            knapsack = []
-            for j in range(len(self.items)):
-                if self.solver.Value(self.x[i,j]) == 1:
-                    knapsack.append(self.items[j])
-            sol.append(knapsack)
+        warm_start_value = sum(
+            value for value, i in zip(self.values, self.warm_start) if i is not None
+        )
+        if status == OPTIMAL or (
+            status == FEASIBLE and self.solver.ObjectiveValue() >= warm_start_value
+        ):
+            sol = []
+            for i in range(len(self.capacities)):
+                knapsack = []
+                for j in range(len(self.items)):
+                    if self.solver.Value(self.x[i,j]) == 1:
+                        knapsack.append(self.items[j])
+                sol.append(knapsack)
+            self._report(round(self.solver.ObjectiveValue()), self.solver.BestObjectiveBound())
+            return Solution(knapsacks=sol)
 
+        # time limit hit without a better solution: fall back to the warm start
+        sol = [[] for _ in self.capacities]
+        for j, i in enumerate(self.warm_start):
+            if i is not None:
+                sol[i].append(self.items[j])
+        if status == FEASIBLE:
+            bound = self.solver.BestObjectiveBound()
+        else:  # no bound known yet
+            bound = fractional_upper_bound(self.weights, self.values, self.capacities)
+        self._report(warm_start_value, bound)
         return Solution(knapsacks=sol)
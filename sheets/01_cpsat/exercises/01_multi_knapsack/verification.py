@@ -0,0 +1,49 @@
+from typing import Dict, List, Optional, Union
+from uuid import UUID
+
+from data_schema import Instance, Solution
+from instance_loader import ColumnarInstance, column_data
+
+
+def verify_solution(
+    instance: Union[Instance, ColumnarInstance], solution: Solution
+) -> int:
+    """
+    Check that the solution is feasible for the instance and return its score.
+    Every packed item is looked up once in an id -> item index, so the check runs in
+    linear time in the number of items. Raises a ValueError for infeasible solutions.
+    """
+    if len(solution.knapsacks) != len(instance.capacities):
+        msg = f"The solution list must contain a list of items for each knapsack! The solution has {len(solution.knapsacks)} knapsacks, but the instance has {len(instance.capacities)} knapsacks."
+        raise ValueError(msg)
+    weights, values = column_data(instance)
+    index: Optional[Dict[UUID, int]] = None
+    if not isinstance(instance, ColumnarInstance):
+        index = {item.id: j for j, item in enumerate(instance.items)}
+    # knapsack of every item, None if not packed
+    knapsack_of: List[Optional[int]] = [None] * len(weights)
+
+    score = 0
+    for i, (knapsack, capacity) in enumerate(
+        zip(solution.knapsacks, instance.capacities)
+    ):
+        used_capacity = 0
+        for item in knapsack:
+            if index is not None:
+                j = index.get(item.id)
+            else:
+                j = instance.item_index(item)
+                j = j if j < len(weights) else None
+            if j is None or (item.weight, item.value) != (weights[j], values[j]):
+                msg = f"Item {item.id} is not part of the instance!"
+                raise ValueError(msg)
+            if knapsack_of[j] is not None:
+                msg = f"Item {j} occurs in more than one knapsack! Specifically, in knapsacks nr {[knapsack_of[j], i]}!"
+                raise ValueError(msg)
+            knapsack_of[j] = i
+            used_capacity += weights[j]
+            score += values[j]
+        if used_capacity > capacity:
+            msg = f"'Knapsack {i}'s capacity was exceeded! ({used_capacity}/{capacity})"
+            raise ValueError(msg)
+    return score
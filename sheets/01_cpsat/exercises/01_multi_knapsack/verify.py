@@ -6,8 +6,9 @@ It tests the correctness of the solution returned by the solver for different in
 import json
 import os
 
-from _alglab_utils import CHECK, main, mandatory_testcase
+from _alglab_utils import CHECK, FAIL, main, mandatory_testcase
 from solution import Instance, MultiKnapsackSolver, Solution
+from verification import verify_solution
 
 INSTANCE_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "instances")
 
@@ -22,32 +23,11 @@ def solve_instance_and_check_solution(filename: str, solution_score: int):
 
     CHECK(isinstance(solution, Solution), "The solution must be of type 'list'.")
     CHECK(solution is not None, "The solution is None!")
-    CHECK(
-        len(solution.knapsacks) == len(instance.capacities),
-        f"The solution list must contain a list of items for each knapsack! The solution has {len(solution.knapsacks)} knapsacks, but the instance has {len(instance.capacities)} knapsacks.",
-    )
-
-    # count occurrences of each item
-    for i, item in enumerate(instance.items):
-        if occurrences := [
-            j for j, knapsack in enumerate(solution) if item in knapsack
-        ]:
-            CHECK(
-                len(occurrences) == 1,
-                f"Item {i} occurs in more than one knapsack! Specifically, in knapsacks nr {occurrences}!",
-            )
-
-    # check capacity constraint and solution score
-    score = 0
-    for (j, knapsack), capacity in zip(
-        enumerate(solution.knapsacks), instance.capacities
-    ):
-        used_capacity = sum(item.weight for item in knapsack)
-        CHECK(
-            used_capacity <= capacity,
-            f"'Knapsack {j}'s capacity was exceeded! ({used_capacity}/{capacity})",
-        )
-        score += sum(item.value for item in knapsack)
+    # feasibility and score in one linear pass over the packed items
+    try:
+        score = verify_solution(instance, solution)
+    except ValueError as e:
+        FAIL(str(e))
 
     CHECK(
         score == solution_score,
@@ -1,39 +1,208 @@
 import os
 import sqlite3
-from typing import List
+import threading
+from collections import defaultdict
+from pathlib import Path
+from typing import Dict, Iterable, List, Tuple
 
 from database import Donor, Recipient, TransplantDatabase
 
+# Join condition for compatible donors (d) and recipients (r).
+_COMPATIBILITY_JOIN = """
+    JOIN recipients AS r ON d.tissue_type = r.tissue_type AND (
+        CASE
+            WHEN d.blood_type = 'A' THEN r.blood_type IN ('A', 'AB')
+            WHEN d.blood_type = 'B' THEN r.blood_type IN ('B', 'AB')
+            WHEN d.blood_type = 'AB' THEN r.blood_type = 'AB'
+            WHEN d.blood_type = 'O' THEN 1  -- 'O' can donate to any blood type
+            ELSE 0  -- Handle other cases if needed
+        END
+    )
+"""
+
+
+# Name of the materialized compatibility table (donor_id, recipient_id), which
+# _db_migrate.py adds to a database. If present, it replaces the join above.
+COMPATIBLE_TABLE = "compatible"
+
+
+def has_compatible_table(dbcon: sqlite3.Connection) -> bool:
+    """
+    Check whether the database contains the materialized compatibility table.
+    """
+    row = dbcon.execute(
+        "SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = ?",
+        (COMPATIBLE_TABLE,),
+    ).fetchone()
+    return row is not None
+
+
+def select_compatible_pairs(dbcon: sqlite3.Connection) -> str:
+    """
+    A query for all compatible (donor id, recipient id) pairs, ordered by donor
+    and recipient id, using the materialized table if present.
+    """
+    if has_compatible_table(dbcon):
+        return f"""
+            SELECT donor_id, recipient_id
+            FROM {COMPATIBLE_TABLE}
+            ORDER BY donor_id, recipient_id
+        """
+    return f"""
+        SELECT d.id, r.id
+        FROM donors AS d
+        {_COMPATIBILITY_JOIN}
+        ORDER BY d.id, r.id
+    """
+
+
+# Statements are module constants, such that each connection prepares them only
+# once and then takes them from its statement cache.
+_SELECT_DONORS = "SELECT id FROM donors"
+_SELECT_RECIPIENTS = "SELECT id FROM recipients"
+_SELECT_COMPATIBLE_DONORS = f"""
+    SELECT r.id, d.id
+    FROM donors AS d
+    {_COMPATIBILITY_JOIN}
+    WHERE r.id IN ({{}})
+"""
+_SELECT_COMPATIBLE_RECIPIENTS = f"""
+    SELECT d.id, r.id
+    FROM donors AS d
+    {_COMPATIBILITY_JOIN}
+    WHERE d.id IN ({{}})
+"""
+_SELECT_MATERIALIZED_COMPATIBLE_DONORS = f"""
+    SELECT recipient_id, donor_id
+    FROM {COMPATIBLE_TABLE}
+    WHERE recipient_id IN ({{}})
+"""
+_SELECT_MATERIALIZED_COMPATIBLE_RECIPIENTS = f"""
+    SELECT donor_id, recipient_id
+    FROM {COMPATIBLE_TABLE}
+    WHERE donor_id IN ({{}})
+"""
+_SELECT_PARTNER_DONORS = "SELECT represents, id FROM donors WHERE represents IN ({})"
+_SELECT_PARTNER_RECIPIENT = """
+    SELECT d.id, r.id
+    FROM recipients r
+    JOIN donors d
+    ON r.id = d.represents
+    WHERE d.id IN ({})
+"""
+# Batch queries bind at most this many ids at once (SQLite's default limit is 999).
+_BATCH_SIZE = 900
+_READ_PRAGMAS = (
+    "PRAGMA query_only = ON",
+    "PRAGMA mmap_size = 268435456",  # 256 MiB
+    "PRAGMA cache_size = -65536",  # 64 MiB
+    "PRAGMA temp_store = MEMORY",
+)
+
 
 class SqliteTransplantDatabase(TransplantDatabase):
     """
     This is a concrete implementation of the TransplantDatabase interface,
     which fetches the data from an underlying sqlite3 database.
+
+    The database is opened read-only and every thread gets its own connection, such
+    that model builders in several threads can query the same instance concurrently.
+    With `immutable=True` (default), SQLite additionally skips all locking, so the
+    file must not be modified while it is open.
     """
 
-    def __init__(self, path: str) -> None:
+    def __init__(self, path: str, immutable: bool = True) -> None:
         super().__init__()
         if not os.path.exists(path):
             raise FileNotFoundError(f"File {path} does not exist!")
-        self.dbcon = sqlite3.connect(path)
+        self._uri = Path(path).absolute().as_uri() + "?mode=ro"
+        if immutable:
+            self._uri += "&immutable=1"
+        self._local = threading.local()
+        self._connections: List[sqlite3.Connection] = []
+        self._lock = threading.Lock()
+        # the (immutable) data objects are shared between queries
+        self._donors: Dict[int, Donor] = {}
+        self._recipients: Dict[int, Recipient] = {}
+        # fails early, if the database cannot be opened
+        if has_compatible_table(self._connection()):
+            self._select_compatible_donors = _SELECT_MATERIALIZED_COMPATIBLE_DONORS
+            self._select_compatible_recipients = (
+                _SELECT_MATERIALIZED_COMPATIBLE_RECIPIENTS
+            )
+        else:
+            self._select_compatible_donors = _SELECT_COMPATIBLE_DONORS
+            self._select_compatible_recipients = _SELECT_COMPATIBLE_RECIPIENTS
+
+    @property
+    def dbcon(self) -> sqlite3.Connection:
+        """
+        The connection of the calling thread.
+        """
+        return self._connection()
+
+    def _connection(self) -> sqlite3.Connection:
+        dbcon = getattr(self._local, "dbcon", None)
+        if dbcon is None:
+            # closed from any thread in close(), but only used by the creating thread
+            dbcon = sqlite3.connect(
+                self._uri, uri=True, cached_statements=32, check_same_thread=False
+            )
+            for pragma in _READ_PRAGMAS:
+                dbcon.execute(pragma)
+            self._local.dbcon = dbcon
+            with self._lock:
+                self._connections.append(dbcon)
+        return dbcon
+
+    def close(self) -> None:
+        """
+        Close the connections of all threads.
+        """
+        with self._lock:
+            for dbcon in self._connections:
+                dbcon.close()
+            self._connections.clear()
+        self._local = threading.local()
+
+    def _donor(self, donor_id: int) -> Donor:
+        donor = self._donors.get(donor_id)
+        if donor is None:
+            donor = self._donors.setdefault(donor_id, Donor(id=donor_id))
+        return donor
+
+    def _recipient(self, recipient_id: int) -> Recipient:
+        recipient = self._recipients.get(recipient_id)
+        if recipient is None:
+            recipient = self._recipients.setdefault(
+                recipient_id, Recipient(id=recipient_id)
+            )
+        return recipient
+
+    def _query_in(self, query: str, ids: List[int]) -> List[Tuple[int, int]]:
+        """
+        Run a query with an `IN ({})` placeholder for the given ids, in batches.
+        """
+        rows = []
+        for start in range(0, len(ids), _BATCH_SIZE):
+            batch = ids[start : start + _BATCH_SIZE]
+            sql = query.format(",".join("?" * len(batch)))
+            rows.extend(self.dbcon.execute(sql, batch).fetchall())
+        return rows
 
     def get_all_donors(self) -> List[Donor]:
         """
         Get all registered donors from the database.
         """
-        cur = self.dbcon.cursor()
-        cur.row_factory = sqlite3.Row
-        cur.execute("SELECT id, represents FROM donors")
-        return [Donor(id=row["id"]) for row in cur.fetchall()]
+        return [self._donor(row[0]) for row in self.dbcon.execute(_SELECT_DONORS)]
 
     def get_all_recipients(self) -> List[Recipient]:
         """
         Get all recipients from the database.
         """
-        cur = self.dbcon.cursor()
-        cur.row_factory = sqlite3.Row
-        cur.execute("SELECT id FROM recipients")
-        return [Recipient(id=row["id"]) for row in cur.fetchall()]
+        return [
+            self._recipient(row[0]) for row in self.dbcon.execute(_SELECT_RECIPIENTS)
+        ]
 
     def get_compatible_donors(self, recipient: Recipient) -> List[Donor]:
         """
@@ -43,27 +212,7 @@ class SqliteTransplantDatabase(TransplantDatabase):
         This is calculated using a SQL query, using blood types and tissue types
         from the database schema.
         """
-
-        cur = self.dbcon.cursor()
-        cur.row_factory = sqlite3.Row
-        cur.execute(
-            """
-            SELECT d.id
-            FROM donors AS d
-            JOIN recipients AS r ON d.tissue_type = r.tissue_type AND (
-                CASE
-                    WHEN d.blood_type = 'A' THEN r.blood_type IN ('A', 'AB')
-                    WHEN d.blood_type = 'B' THEN r.blood_type IN ('B', 'AB')
-                    WHEN d.blood_type = 'AB' THEN r.blood_type = 'AB'
-                    WHEN d.blood_type = 'O' THEN 1  -- 'O' can donate to any blood type
-                    ELSE 0  -- Handle other cases if needed
-                END
-            )
-            WHERE r.id = ?
-            """,
-            (int(recipient.id),),
-        )
-        return [Donor(id=row["id"]) for row in cur.fetchall()]
+        return self.get_compatible_donors_batch([recipient])[recipient]
 
     def get_compatible_recipients(self, donor: Donor) -> List[Recipient]:
         """
@@ -73,27 +222,153 @@ class SqliteTransplantDatabase(TransplantDatabase):
         This is calculated using a SQL query, using blood types and tissue types
         from the database schema.
         """
+        return self.get_compatible_recipients_batch([donor])[donor]
+
+    def get_partner_donors(self, recipient: Recipient) -> List[Donor]:
+        """
+        For a given recipient, find the associated representative donor(s).
+        Even if only one donor is registered as the partner of the given
+        donor, a list is returned.
+        """
+        return self.get_partner_donors_batch([recipient])[recipient]
+
+    def get_partner_recipient(self, donor: Donor) -> Recipient:
+        """
+        For a given donor, find the represented recipient.
+        """
+        return self.get_partner_recipient_batch([donor])[donor]
+
+    def get_compatible_donors_batch(
+        self, recipients: Iterable[Recipient]
+    ) -> Dict[Recipient, List[Donor]]:
+        """
+        `get_compatible_donors` for each of the given recipients, with one query
+        per batch of recipients.
+        """
+        result: Dict[Recipient, List[Donor]] = {rec: [] for rec in recipients}
+        by_id = {int(rec.id): donors for rec, donors in result.items()}
+        for recipient_id, donor_id in self._query_in(
+            self._select_compatible_donors, list(by_id)
+        ):
+            by_id[recipient_id].append(self._donor(donor_id))
+        return result
+
+    def get_compatible_recipients_batch(
+        self, donors: Iterable[Donor]
+    ) -> Dict[Donor, List[Recipient]]:
+        """
+        `get_compatible_recipients` for each of the given donors, with one query
+        per batch of donors.
+        """
+        result: Dict[Donor, List[Recipient]] = {don: [] for don in donors}
+        by_id = {int(don.id): recipients for don, recipients in result.items()}
+        for donor_id, recipient_id in self._query_in(
+            self._select_compatible_recipients, list(by_id)
+        ):
+            by_id[donor_id].append(self._recipient(recipient_id))
+        return result
+
+    def get_partner_donors_batch(
+        self, recipients: Iterable[Recipient]
+    ) -> Dict[Recipient, List[Donor]]:
+        """
+        `get_partner_donors` for each of the given recipients, with one query per
+        batch of recipients.
+        """
+        result: Dict[Recipient, List[Donor]] = {rec: [] for rec in recipients}
+        by_id = {int(rec.id): donors for rec, donors in result.items()}
+        for recipient_id, donor_id in self._query_in(
+            _SELECT_PARTNER_DONORS, list(by_id)
+        ):
+            by_id[recipient_id].append(self._donor(donor_id))
+        return result
+
+    def get_partner_recipient_batch(
+        self, donors: Iterable[Donor]
+    ) -> Dict[Donor, Recipient]:
+        """
+        `get_partner_recipient` for each of the given donors, with one query per
+        batch of donors.
+        """
+        donors = list(donors)
+        partners = dict(
+            self._query_in(_SELECT_PARTNER_RECIPIENT, [int(don.id) for don in donors])
+        )
+        return {don: self._recipient(partners[int(don.id)]) for don in donors}
+
 
-        cur = self.dbcon.cursor()
-        cur.row_factory = sqlite3.Row
-        cur.execute(
+class CachedTransplantDatabase(TransplantDatabase):
+    """
+    A TransplantDatabase that loads all donors, recipients, partner links and the
+    complete compatibility relation from an sqlite3 database with a few set-based
+    queries on construction. All queries are then answered from in-memory indices,
+    instead of running a separate SQL query per call.
+    """
+
+    def __init__(self, path: str) -> None:
+        super().__init__()
+        if not os.path.exists(path):
+            raise FileNotFoundError(f"File {path} does not exist!")
+        dbcon = sqlite3.connect(path)
+        try:
+            self._load(dbcon)
+        finally:
+            dbcon.close()
+
+    def _load(self, dbcon: sqlite3.Connection) -> None:
+        self._donors: Dict[int, Donor] = {
+            donor_id: Donor(id=donor_id)
+            for (donor_id,) in dbcon.execute("SELECT id FROM donors ORDER BY id")
+        }
+        self._recipients: Dict[int, Recipient] = {
+            recipient_id: Recipient(id=recipient_id)
+            for (recipient_id,) in dbcon.execute(
+                "SELECT id FROM recipients ORDER BY id"
+            )
+        }
+        self._compatible_donors: Dict[int, List[Donor]] = defaultdict(list)
+        self._compatible_recipients: Dict[int, List[Recipient]] = defaultdict(list)
+        for donor_id, recipient_id in dbcon.execute(select_compatible_pairs(dbcon)):
+            self._compatible_donors[recipient_id].append(self._donors[donor_id])
+            self._compatible_recipients[donor_id].append(self._recipients[recipient_id])
+        self._partner_donors: Dict[int, List[Donor]] = defaultdict(list)
+        self._partner_recipient: Dict[int, Recipient] = {}
+        for donor_id, recipient_id in dbcon.execute(
             """
-            SELECT r.id
+            SELECT d.id, r.id
             FROM donors AS d
-            JOIN recipients AS r ON d.tissue_type = r.tissue_type AND (
-                CASE
-                    WHEN d.blood_type = 'A' THEN r.blood_type IN ('A', 'AB')
-                    WHEN d.blood_type = 'B' THEN r.blood_type IN ('B', 'AB')
-                    WHEN d.blood_type = 'AB' THEN r.blood_type = 'AB'
-                    WHEN d.blood_type = 'O' THEN 1  -- 'O' can donate to any blood type
-                    ELSE 0  -- Handle other cases if needed
-                END
-            )
-            WHERE d.id = ?
-            """,
-            (int(donor.id),),
-        )
-        return [Recipient(id=row["id"]) for row in cur.fetchall()]
+            JOIN recipients AS r ON r.id = d.represents
+            ORDER BY d.id
+            """
+        ):
+            self._partner_donors[recipient_id].append(self._donors[donor_id])
+            self._partner_recipient[donor_id] = self._recipients[recipient_id]
+
+    def get_all_donors(self) -> List[Donor]:
+        """
+        Get all registered donors from the database.
+        """
+        return list(self._donors.values())
+
+    def get_all_recipients(self) -> List[Recipient]:
+        """
+        Get all recipients from the database.
+        """
+        return list(self._recipients.values())
+
+    def get_compatible_donors(self, recipient: Recipient) -> List[Donor]:
+        """
+        For a given recipient, get a list of all compatible donors,
+        that are registered in the database.
+        """
+        return list(self._compatible_donors.get(int(recipient.id), ()))
+
+    def get_compatible_recipients(self, donor: Donor) -> List[Recipient]:
+        """
+        For a given donor, get a list of all compatible recipients,
+        that are registered in the database.
+        """
+        return list(self._compatible_recipients.get(int(donor.id), ()))
 
     def get_partner_donors(self, recipient: Recipient) -> List[Donor]:
         """
@@ -101,31 +376,10 @@ class SqliteTransplantDatabase(TransplantDatabase):
         Even if only one donor is registered as the partner of the given
         donor, a list is returned.
         """
-
-        cur = self.dbcon.cursor()
-        cur.row_factory = sqlite3.Row
-        cur.execute(
-            "SELECT id FROM donors WHERE represents = ?",
-            (int(recipient.id),),
-        )
-        return [Donor(id=row["id"]) for row in cur.fetchall()]
+        return list(self._partner_donors.get(int(recipient.id), ()))
 
     def get_partner_recipient(self, donor: Donor) -> Recipient:
         """
         For a given donor, find the represented recipient.
         """
-
-        cur = self.dbcon.cursor()
-        cur.row_factory = sqlite3.Row
-        cur.execute(
-            """
-            SELECT r.id
-            FROM recipients r
-            JOIN donors d
-            ON r.id = d.represents
-            WHERE d.id = ?
-            """,
-            (int(donor.id),),
-        )
-        row = cur.fetchone()
-        return Recipient(id=row["id"])
+        return self._partner_recipient[int(donor.id)]
@@ -0,0 +1,175 @@
+"""
+Optimizes transplant instances (.db) for the compatibility queries:
+
+- indexes on `donors.represents` and on the tissue and blood types of donors and
+  recipients, such that the compatibility join does not have to scan the tables,
+- a materialized `compatible(donor_id, recipient_id)` table with all compatible
+  pairs, indexed in both directions, which `_db_impl` detects and queries instead
+  of the join. Triggers keep it up to date if donors or recipients change.
+
+The migration only adds tables, indexes and triggers, and can be reverted with
+`--revert`. Close all open (immutable) connections to a database before migrating it.
+
+Usage: python _db_migrate.py instances/*.db
+"""
+
+import argparse
+import contextlib
+import os
+import sqlite3
+from typing import Iterator
+
+from _db_impl import _COMPATIBILITY_JOIN, COMPATIBLE_TABLE
+
+_INDEXES = {
+    "donors_represents": "donors (represents)",
+    "donors_tissue_blood": "donors (tissue_type, blood_type)",
+    "recipients_tissue_blood": "recipients (tissue_type, blood_type)",
+    f"{COMPATIBLE_TABLE}_recipient": f"{COMPATIBLE_TABLE} (recipient_id, donor_id)",
+}
+
+# Keep the compatible pairs in sync with the donors and recipients. An update is
+# handled as a delete followed by an insert.
+_TRIGGERS = {
+    "donors_insert_compatible": f"""
+        AFTER INSERT ON donors BEGIN
+            INSERT INTO {COMPATIBLE_TABLE}
+            SELECT d.id, r.id FROM donors AS d {_COMPATIBILITY_JOIN}
+            WHERE d.id = NEW.id;
+        END
+    """,
+    "donors_delete_compatible": f"""
+        AFTER DELETE ON donors BEGIN
+            DELETE FROM {COMPATIBLE_TABLE} WHERE donor_id = OLD.id;
+        END
+    """,
+    "donors_update_compatible": f"""
+        AFTER UPDATE OF id, blood_type, tissue_type ON donors BEGIN
+            DELETE FROM {COMPATIBLE_TABLE} WHERE donor_id = OLD.id;
+            INSERT INTO {COMPATIBLE_TABLE}
+            SELECT d.id, r.id FROM donors AS d {_COMPATIBILITY_JOIN}
+            WHERE d.id = NEW.id;
+        END
+    """,
+    "recipients_insert_compatible": f"""
+        AFTER INSERT ON recipients BEGIN
+            INSERT INTO {COMPATIBLE_TABLE}
+            SELECT d.id, r.id FROM donors AS d {_COMPATIBILITY_JOIN}
+            WHERE r.id = NEW.id;
+        END
+    """,
+    "recipients_delete_compatible": f"""
+        AFTER DELETE ON recipients BEGIN
+            DELETE FROM {COMPATIBLE_TABLE} WHERE recipient_id = OLD.id;
+        END
+    """,
+    "recipients_update_compatible": f"""
+        AFTER UPDATE OF id, blood_type, tissue_type ON recipients BEGIN
+            DELETE FROM {COMPATIBLE_TABLE} WHERE recipient_id = OLD.id;
+            INSERT INTO {COMPATIBLE_TABLE}
+            SELECT d.id, r.id FROM donors AS d {_COMPATIBILITY_JOIN}
+            WHERE r.id = NEW.id;
+        END
+    """,
+}
+
+
+def migrate(db_path: str) -> int:
+    """
+    Add the indexes, the materialized compatibility table and its triggers to the
+    given database. An existing compatibility table is rebuilt.
+    Returns the number of compatible pairs.
+    """
+    if not os.path.exists(db_path):
+        msg = f"File {db_path} does not exist!"
+        raise FileNotFoundError(msg)
+    # autocommit mode, the transactions are explicit (see `_transaction`)
+    dbcon = sqlite3.connect(db_path, isolation_level=None)
+    try:
+        with _transaction(dbcon):
+            _drop(dbcon)
+            dbcon.execute(
+                f"""
+                CREATE TABLE {COMPATIBLE_TABLE} (
+                    donor_id INTEGER NOT NULL,
+                    recipient_id INTEGER NOT NULL,
+                    PRIMARY KEY (donor_id, recipient_id)
+                ) WITHOUT ROWID
+                """
+            )
+            for name, columns in _INDEXES.items():
+                dbcon.execute(f"CREATE INDEX {name} ON {columns}")
+            dbcon.execute(
+                f"""
+                INSERT INTO {COMPATIBLE_TABLE}
+                SELECT d.id, r.id FROM donors AS d {_COMPATIBILITY_JOIN}
+                """
+            )
+            for name, body in _TRIGGERS.items():
+                dbcon.execute(f"CREATE TRIGGER {name} {body}")
+        dbcon.execute("ANALYZE")
+        (num_pairs,) = dbcon.execute(
+            f"SELECT COUNT(*) FROM {COMPATIBLE_TABLE}"
+        ).fetchone()
+    finally:
+        dbcon.close()
+    return num_pairs
+
+
+@contextlib.contextmanager
+def _transaction(dbcon: sqlite3.Connection) -> Iterator[None]:
+    """
+    Run the statements of the block in a single transaction, including the DDL
+    statements, which the sqlite3 module would otherwise execute outside of it.
+    The connection must be in autocommit mode (`isolation_level=None`).
+    """
+    dbcon.execute("BEGIN")
+    try:
+        yield
+    except BaseException:
+        dbcon.execute("ROLLBACK")
+        raise
+    dbcon.execute("COMMIT")
+
+
+def _drop(dbcon: sqlite3.Connection) -> None:
+    for name in _TRIGGERS:
+        dbcon.execute(f"DROP TRIGGER IF EXISTS {name}")
+    for name in _INDEXES:
+        dbcon.execute(f"DROP INDEX IF EXISTS {name}")
+    dbcon.execute(f"DROP TABLE IF EXISTS {COMPATIBLE_TABLE}")
+
+
+def revert(db_path: str) -> None:
+    """
+    Remove everything that `migrate` added from the given database.
+    """
+    if not os.path.exists(db_path):
+        msg = f"File {db_path} does not exist!"
+        raise FileNotFoundError(msg)
+    # autocommit mode, the transactions are explicit (see `_transaction`)
+    dbcon = sqlite3.connect(db_path, isolation_level=None)
+    try:
+        with _transaction(dbcon):
+            _drop(dbcon)
+            dbcon.execute("DROP TABLE IF EXISTS sqlite_stat1")
+        dbcon.execute("VACUUM")
+    finally:
+        dbcon.close()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(
+        description="Add indexes and a materialized compatibility table to transplant databases."
+    )
+    parser.add_argument("databases", nargs="+", help="The .db files to migrate.")
+    parser.add_argument(
+        "--revert", action="store_true", help="Remove the indexes and the table again."
+    )
+    args = parser.parse_args()
+    for db_path in args.databases:
+        if args.revert:
+            revert(db_path)
+            print("Reverted", db_path)
+        else:
+            print(f"Migrated {db_path}: {migrate(db_path)} compatible pairs")
@@ -0,0 +1,250 @@
+"""
+Compiles a transplant instance (.db) into a compact binary snapshot, in which the
+compatibility and partner relations are stored as CSR adjacency arrays. Snapshots
+are memory-mapped on load, such that repeated solves do not have to re-derive the
+compatibilities via SQL.
+
+Usage: python _db_snapshot.py instances/*.db
+"""
+
+import argparse
+import json
+import os
+import sqlite3
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+from _db_impl import select_compatible_pairs
+from database import Donor, Recipient, TransplantDatabase
+
+_MAGIC = b"TXSNAP1\n"
+_ALIGNMENT = 64
+SNAPSHOT_SUFFIX = ".snapshot"
+
+
+def _csr(
+    num_rows: int, rows: np.ndarray, cols: np.ndarray
+) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Build the CSR representation (indptr, indices) of the given (row, col) pairs.
+    """
+    order = np.lexsort((cols, rows))
+    indptr = np.zeros(num_rows + 1, dtype=np.int64)
+    np.cumsum(np.bincount(rows, minlength=num_rows), out=indptr[1:])
+    return indptr, cols[order].astype(np.int32)
+
+
+def _read_pairs(dbcon: sqlite3.Connection, query: str) -> np.ndarray:
+    return np.array(dbcon.execute(query).fetchall(), dtype=np.int64).reshape(-1, 2)
+
+
+def compile_snapshot(db_path: str, snapshot_path: Optional[str] = None) -> str:
+    """
+    Compile the given sqlite3 transplant database into a binary snapshot.
+    Returns the path of the written snapshot.
+    """
+    if not os.path.exists(db_path):
+        raise FileNotFoundError(f"File {db_path} does not exist!")
+    snapshot_path = snapshot_path or db_path + SNAPSHOT_SUFFIX
+    dbcon = sqlite3.connect(db_path)
+    try:
+        donor_ids = np.array(
+            [row[0] for row in dbcon.execute("SELECT id FROM donors ORDER BY id")],
+            dtype=np.int64,
+        )
+        recipient_ids = np.array(
+            [row[0] for row in dbcon.execute("SELECT id FROM recipients ORDER BY id")],
+            dtype=np.int64,
+        )
+        compatible = _read_pairs(dbcon, select_compatible_pairs(dbcon))
+        partners = _read_pairs(
+            dbcon,
+            "SELECT d.id, r.id FROM donors AS d JOIN recipients AS r ON r.id = d.represents",
+        )
+    finally:
+        dbcon.close()
+
+    # translate ids to positions in the sorted id arrays
+    compatible_donors = np.searchsorted(donor_ids, compatible[:, 0])
+    compatible_recipients = np.searchsorted(recipient_ids, compatible[:, 1])
+    partner_donors = np.searchsorted(donor_ids, partners[:, 0])
+    partner_recipients = np.searchsorted(recipient_ids, partners[:, 1])
+
+    arrays: Dict[str, np.ndarray] = {
+        "donor_ids": donor_ids,
+        "recipient_ids": recipient_ids,
+    }
+    (
+        arrays["compatible_recipients_indptr"],
+        arrays["compatible_recipients_indices"],
+    ) = _csr(len(donor_ids), compatible_donors, compatible_recipients)
+    (
+        arrays["compatible_donors_indptr"],
+        arrays["compatible_donors_indices"],
+    ) = _csr(len(recipient_ids), compatible_recipients, compatible_donors)
+    (
+        arrays["partner_donors_indptr"],
+        arrays["partner_donors_indices"],
+    ) = _csr(len(recipient_ids), partner_recipients, partner_donors)
+    partner_recipient = np.full(len(donor_ids), -1, dtype=np.int32)
+    partner_recipient[partner_donors] = partner_recipients
+    arrays["partner_recipient"] = partner_recipient
+    _write_arrays(snapshot_path, arrays)
+    return snapshot_path
+
+
+def _write_arrays(path: str, arrays: Dict[str, np.ndarray]) -> None:
+    """
+    File layout: magic, 8 byte header length, JSON header, aligned raw arrays.
+    The header maps every array name to its dtype, byte offset and length.
+    """
+    header: Dict[str, List] = {}
+    offset = 0
+    for name, array in arrays.items():
+        header[name] = [array.dtype.str, offset, len(array)]
+        offset += -(-array.nbytes // _ALIGNMENT) * _ALIGNMENT
+    header_bytes = json.dumps(header).encode()
+    data_start = -(-(len(_MAGIC) + 8 + len(header_bytes)) // _ALIGNMENT) * _ALIGNMENT
+    with open(path, "wb") as f:
+        f.write(_MAGIC)
+        f.write(len(header_bytes).to_bytes(8, "little"))
+        f.write(header_bytes)
+        for name, array in arrays.items():
+            f.seek(data_start + header[name][1])
+            f.write(np.ascontiguousarray(array).tobytes())
+        f.truncate(data_start + offset)
+
+
+def _read_arrays(path: str) -> Dict[str, np.ndarray]:
+    with open(path, "rb") as f:
+        if f.read(len(_MAGIC)) != _MAGIC:
+            raise ValueError(f"File {path} is not a transplant snapshot!")
+        header_length = int.from_bytes(f.read(8), "little")
+        header = json.loads(f.read(header_length))
+    data_start = -(-(len(_MAGIC) + 8 + header_length) // _ALIGNMENT) * _ALIGNMENT
+    return {
+        name: (
+            np.memmap(
+                path, dtype=dtype, mode="r", offset=data_start + offset, shape=(length,)
+            )
+            if length
+            else np.empty(0, dtype=dtype)
+        )
+        for name, (dtype, offset, length) in header.items()
+    }
+
+
+class SnapshotTransplantDatabase(TransplantDatabase):
+    """
+    A TransplantDatabase on top of a memory-mapped snapshot created by
+    `compile_snapshot`. Donors and recipients are only turned into objects
+    when they are requested.
+    """
+
+    def __init__(self, snapshot_path: str) -> None:
+        super().__init__()
+        if not os.path.exists(snapshot_path):
+            raise FileNotFoundError(f"File {snapshot_path} does not exist!")
+        self._arrays = _read_arrays(snapshot_path)
+        self._donor_ids = self._arrays["donor_ids"]
+        self._recipient_ids = self._arrays["recipient_ids"]
+        self._donors: List[Optional[Donor]] = [None] * len(self._donor_ids)
+        self._recipients: List[Optional[Recipient]] = [None] * len(self._recipient_ids)
+
+    @classmethod
+    def from_sqlite(cls, db_path: str) -> "SnapshotTransplantDatabase":
+        """
+        Open the snapshot next to the given database, (re-)compiling it if it is
+        missing or older than the database.
+        """
+        snapshot_path = db_path + SNAPSHOT_SUFFIX
+        if not os.path.exists(snapshot_path) or os.path.getmtime(
+            snapshot_path
+        ) < os.path.getmtime(db_path):
+            compile_snapshot(db_path, snapshot_path)
+        return cls(snapshot_path)
+
+    @staticmethod
+    def _position(ids: np.ndarray, id_: int) -> int:
+        pos = int(np.searchsorted(ids, id_))
+        if pos >= len(ids) or ids[pos] != id_:
+            raise KeyError(id_)
+        return pos
+
+    def _donor(self, pos: int) -> Donor:
+        donor = self._donors[pos]
+        if donor is None:
+            donor = self._donors[pos] = Donor(id=int(self._donor_ids[pos]))
+        return donor
+
+    def _recipient(self, pos: int) -> Recipient:
+        recipient = self._recipients[pos]
+        if recipient is None:
+            recipient = self._recipients[pos] = Recipient(
+                id=int(self._recipient_ids[pos])
+            )
+        return recipient
+
+    def _neighbors(self, relation: str, pos: int) -> np.ndarray:
+        indptr = self._arrays[f"{relation}_indptr"]
+        return self._arrays[f"{relation}_indices"][indptr[pos] : indptr[pos + 1]]
+
+    def get_all_donors(self) -> List[Donor]:
+        """
+        Get all registered donors from the database.
+        """
+        return [self._donor(pos) for pos in range(len(self._donor_ids))]
+
+    def get_all_recipients(self) -> List[Recipient]:
+        """
+        Get all recipients from the database.
+        """
+        return [self._recipient(pos) for pos in range(len(self._recipient_ids))]
+
+    def get_compatible_donors(self, recipient: Recipient) -> List[Donor]:
+        """
+        For a given recipient, get a list of all compatible donors,
+        that are registered in the database.
+        """
+        pos = self._position(self._recipient_ids, int(recipient.id))
+        return [self._donor(int(d)) for d in self._neighbors("compatible_donors", pos)]
+
+    def get_compatible_recipients(self, donor: Donor) -> List[Recipient]:
+        """
+        For a given donor, get a list of all compatible recipients,
+        that are registered in the database.
+        """
+        pos = self._position(self._donor_ids, int(donor.id))
+        return [
+            self._recipient(int(r))
+            for r in self._neighbors("compatible_recipients", pos)
+        ]
+
+    def get_partner_donors(self, recipient: Recipient) -> List[Donor]:
+        """
+        For a given recipient, find the associated representative donor(s).
+        Even if only one donor is registered as the partner of the given
+        donor, a list is returned.
+        """
+        pos = self._position(self._recipient_ids, int(recipient.id))
+        return [self._donor(int(d)) for d in self._neighbors("partner_donors", pos)]
+
+    def get_partner_recipient(self, donor: Donor) -> Recipient:
+        """
+        For a given donor, find the represented recipient.
+        """
+        pos = self._position(self._donor_ids, int(donor.id))
+        recipient_pos = int(self._arrays["partner_recipient"][pos])
+        if recipient_pos < 0:
+            raise KeyError(donor.id)
+        return self._recipient(recipient_pos)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(
+        description="Compile transplant databases into binary snapshots."
+    )
+    parser.add_argument("databases", nargs="+", help="The .db files to compile.")
+    args = parser.parse_args()
+    for db_path in args.databases:
+        print("Compiled", compile_snapshot(db_path))
@@ -1,5 +1,5 @@
 from abc import ABC as AbstractClass
-from typing import List
+from typing import Dict, Iterable, List
 
 from data_schema import Donor, Recipient
 
@@ -53,3 +53,38 @@ class TransplantDatabase(AbstractClass):
         For a given donor, find the represented recipient.
         """
         raise NotImplementedError("This is an abstract class!")
+
+    # Batch variants of the queries above. Implementations may override them
+    # to answer all given entities at once, e.g., with a single SQL query.
+
+    def get_compatible_donors_batch(
+        self, recipients: Iterable[Recipient]
+    ) -> Dict[Recipient, List[Donor]]:
+        """
+        `get_compatible_donors` for each of the given recipients.
+        """
+        return {rec: self.get_compatible_donors(rec) for rec in recipients}
+
+    def get_compatible_recipients_batch(
+        self, donors: Iterable[Donor]
+    ) -> Dict[Donor, List[Recipient]]:
+        """
+        `get_compatible_recipients` for each of the given donors.
+        """
+        return {don: self.get_compatible_recipients(don) for don in donors}
+
+    def get_partner_donors_batch(
+        self, recipients: Iterable[Recipient]
+    ) -> Dict[Recipient, List[Donor]]:
+        """
+        `get_partner_donors` for each of the given recipients.
+        """
+        return {rec: self.get_partner_donors(rec) for rec in recipients}
+
+    def get_partner_recipient_batch(
+        self, donors: Iterable[Donor]
+    ) -> Dict[Donor, Recipient]:
+        """
+        `get_partner_recipient` for each of the given donors.
+        """
+        return {don: self.get_partner_recipient(don) for don in donors}
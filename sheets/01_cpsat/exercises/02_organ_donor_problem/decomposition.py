@@ -0,0 +1,163 @@
+"""
+Decomposition of organ donor instances into independent parts.
+
+Consider the digraph with an arc from patient a to patient b if a partner donor of
+a is compatible with b. In every solution, each receiving patient has a donating
+partner donor and vice versa, so the donations form disjoint cycles in this
+digraph. A cycle never leaves a strongly connected component, hence the instance
+can be split into its strongly connected components, and arcs between them can be
+dropped. As compatibility requires equal tissue types, the components are
+usually small, even for large registries.
+
+The components are solved independently with any of the solvers (on a process
+pool) and the donations are merged into a single solution.
+"""
+
+import math
+from concurrent.futures import ProcessPoolExecutor
+from typing import Any, Dict, List, Optional, Type
+
+import networkx as nx
+from data_schema import Donation, Donor, Recipient, Solution
+from database import TransplantDatabase
+
+
+class ComponentDatabase(TransplantDatabase):
+    """
+    An in-memory TransplantDatabase for a subset of the patients and their partner
+    donors. Only compatibilities within the subset are kept. It can be pickled, to
+    send it to worker processes.
+    """
+
+    def __init__(
+        self,
+        partner_donors: Dict[Recipient, List[Donor]],
+        compatible_recipients: Dict[Donor, List[Recipient]],
+    ) -> None:
+        super().__init__()
+        self._partner_donors = partner_donors
+        self._partner_recipient = {
+            donor: recipient
+            for recipient, donors in partner_donors.items()
+            for donor in donors
+        }
+        self._compatible_recipients = {
+            donor: [rec for rec in recipients if rec in partner_donors]
+            for donor, recipients in compatible_recipients.items()
+            if donor in self._partner_recipient
+        }
+        self._compatible_donors: Dict[Recipient, List[Donor]] = {
+            rec: [] for rec in partner_donors
+        }
+        for donor, recipients in self._compatible_recipients.items():
+            for recipient in recipients:
+                self._compatible_donors[recipient].append(donor)
+
+    def get_all_donors(self) -> List[Donor]:
+        return list(self._partner_recipient)
+
+    def get_all_recipients(self) -> List[Recipient]:
+        return list(self._partner_donors)
+
+    def get_compatible_donors(self, recipient: Recipient) -> List[Donor]:
+        return list(self._compatible_donors.get(recipient, ()))
+
+    def get_compatible_recipients(self, donor: Donor) -> List[Recipient]:
+        return list(self._compatible_recipients.get(donor, ()))
+
+    def get_partner_donors(self, recipient: Recipient) -> List[Donor]:
+        return list(self._partner_donors.get(recipient, ()))
+
+    def get_partner_recipient(self, donor: Donor) -> Recipient:
+        return self._partner_recipient[donor]
+
+
+def split_database(database: TransplantDatabase) -> List[ComponentDatabase]:
+    """
+    Split the instance into the strongly connected components of its patient
+    digraph. Components without any possible donation are omitted.
+    """
+    recipients = database.get_all_recipients()
+    partner_donors = database.get_partner_donors_batch(recipients)
+    donors = [don for dons in partner_donors.values() for don in dons]
+    compatible_recipients = database.get_compatible_recipients_batch(donors)
+
+    graph = nx.DiGraph()
+    graph.add_nodes_from(recipients)
+    for recipient, dons in partner_donors.items():
+        for donor in dons:
+            graph.add_edges_from(
+                (recipient, other) for other in compatible_recipients[donor]
+            )
+    components = []
+    for component in nx.strongly_connected_components(graph):
+        if len(component) == 1 and not any(
+            graph.has_edge(rec, rec) for rec in component
+        ):
+            continue  # a single patient without compatible partner donor
+        components.append(
+            ComponentDatabase(
+                {rec: partner_donors[rec] for rec in component},
+                {
+                    don: compatible_recipients[don]
+                    for rec in component
+                    for don in partner_donors[rec]
+                },
+            )
+        )
+    return components
+
+
+def _solve_component(
+    solver_class: Type,
+    database: ComponentDatabase,
+    kwargs: Dict[str, Any],
+    timelimit: float,
+) -> List[Donation]:
+    solver = solver_class(database, **kwargs)
+    return solver.optimize(timelimit).donations
+
+
+class DecomposedTransplantSolver:
+    """
+    Solves every independent component of an instance with its own model, using
+    the given solver class, e.g., CrossoverTransplantSolver or
+    CycleLimitingCrossoverTransplantSolver. Additional keyword arguments are
+    passed to the solver class.
+
+    On platforms that start worker processes with 'spawn' (Windows, macOS), it has
+    to be used from within an `if __name__ == "__main__":` block.
+    """
+
+    def __init__(
+        self,
+        database: TransplantDatabase,
+        solver_class: Type,
+        max_workers: Optional[int] = None,
+        **solver_kwargs: Any,
+    ) -> None:
+        self.components = split_database(database)
+        self.solver_class = solver_class
+        self.max_workers = max_workers
+        self.solver_kwargs = solver_kwargs
+
+    def optimize(self, timelimit: float = math.inf) -> Solution:
+        """
+        Solve the components (in parallel, if max_workers is not 1), each with the
+        given time limit, and merge their donations.
+        """
+        if timelimit <= 0.0:
+            return Solution(donations=[])
+        # large components first, such that they do not end up last in the pool
+        components = sorted(
+            self.components, key=lambda c: len(c.get_all_donors()), reverse=True
+        )
+        args = [
+            (self.solver_class, c, self.solver_kwargs, timelimit) for c in components
+        ]
+        if self.max_workers == 1 or len(components) <= 1:
+            results = [_solve_component(*arg) for arg in args]
+        else:
+            with ProcessPoolExecutor(self.max_workers) as pool:
+                results = list(pool.map(_solve_component, *zip(*args)))
+        return Solution(donations=[don for donations in results for don in donations])
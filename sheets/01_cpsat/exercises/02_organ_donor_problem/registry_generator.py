@@ -0,0 +1,170 @@
+"""
+Generates synthetic transplant registries as SQLite databases with the schema of
+the instances in `instances/`, such that larger or controlled instances can be
+created reproducibly:
+
+    python registry_generator.py registries/5000.db --patients 5000 --density 0.02
+
+Every patient gets one or more partner donors. Blood types follow the given
+frequencies, tissue types are uniform. A donor is compatible with a patient if
+they have the same tissue type and compatible blood types, so the expected
+fraction of compatible donor-patient pairs (the density) is the probability of
+compatible blood types divided by the number of tissue types. Donors of related
+patients share the tissue type of their patient with probability
+`tissue_correlation`, and are redrawn until they are incompatible with their own
+patient (otherwise they would not need a crossover transplant).
+"""
+
+import argparse
+import os
+import random
+import sqlite3
+from typing import Dict, Optional, Sequence, Tuple
+
+# can donate to
+BLOOD_COMPATIBILITY: Dict[str, Tuple[str, ...]] = {
+    "O": ("O", "A", "B", "AB"),
+    "A": ("A", "AB"),
+    "B": ("B", "AB"),
+    "AB": ("AB",),
+}
+# approximate frequencies in the European population
+BLOOD_TYPE_FREQUENCIES: Dict[str, float] = {"O": 0.41, "A": 0.43, "B": 0.11, "AB": 0.05}
+# probabilities of 1, 2, 3, ... partner donors per patient
+PARTNER_DONOR_FREQUENCIES: Tuple[float, ...] = (0.75, 0.2, 0.05)
+_MAX_DRAWS = 100
+
+
+def blood_compatibility_probability(
+    blood_type_frequencies: Dict[str, float] = BLOOD_TYPE_FREQUENCIES,
+) -> float:
+    """
+    The probability that a random donor can donate to a random patient w.r.t.
+    blood types only.
+    """
+    total = sum(blood_type_frequencies.values())
+    return sum(
+        blood_type_frequencies[donor] * blood_type_frequencies.get(recipient, 0.0)
+        for donor, recipients in BLOOD_COMPATIBILITY.items()
+        if donor in blood_type_frequencies
+        for recipient in recipients
+    ) / (total * total)
+
+
+def tissue_types_for_density(
+    density: float,
+    blood_type_frequencies: Dict[str, float] = BLOOD_TYPE_FREQUENCIES,
+) -> int:
+    """
+    The number of tissue types for the given expected fraction of compatible
+    donor-patient pairs.
+    """
+    if not 0.0 < density <= 1.0:
+        msg = "The density must be in (0, 1]."
+        raise ValueError(msg)
+    return max(
+        1, round(blood_compatibility_probability(blood_type_frequencies) / density)
+    )
+
+
+def _is_compatible(donor: Tuple[str, int], recipient: Tuple[str, int]) -> bool:
+    return donor[1] == recipient[1] and recipient[0] in BLOOD_COMPATIBILITY[donor[0]]
+
+
+def generate_registry(
+    path: str,
+    num_patients: int,
+    num_tissue_types: int = 10,
+    seed: int = 0,
+    tissue_correlation: float = 0.0,
+    blood_type_frequencies: Dict[str, float] = BLOOD_TYPE_FREQUENCIES,
+    partner_donor_frequencies: Sequence[float] = PARTNER_DONOR_FREQUENCIES,
+    overwrite: bool = False,
+) -> str:
+    """
+    Write a random registry with the given number of patients to a new SQLite
+    database at `path`. The same arguments always produce the same database.
+    Returns the path.
+    """
+    if num_patients < 0 or num_tissue_types < 1:
+        msg = "There must be a non-negative number of patients and at least one tissue type."
+        raise ValueError(msg)
+    if not 0.0 <= tissue_correlation <= 1.0:
+        msg = "The tissue correlation must be in [0, 1]."
+        raise ValueError(msg)
+    if os.path.exists(path):
+        if not overwrite:
+            msg = f"File {path} already exists!"
+            raise FileExistsError(msg)
+        os.remove(path)
+
+    rng = random.Random(seed)
+    blood_types = list(blood_type_frequencies)
+    blood_weights = list(blood_type_frequencies.values())
+    num_partners = range(1, len(partner_donor_frequencies) + 1)
+
+    def draw(tissue_type: Optional[int] = None) -> Tuple[str, int]:
+        blood_type = rng.choices(blood_types, blood_weights)[0]
+        if tissue_type is None or rng.random() >= tissue_correlation:
+            tissue_type = rng.randrange(num_tissue_types)
+        return blood_type, tissue_type
+
+    recipients = []
+    donors = []
+    for recipient_id in range(num_patients):
+        recipient = draw()
+        recipients.append((recipient_id, *recipient))
+        for _ in range(rng.choices(num_partners, partner_donor_frequencies)[0]):
+            donor = draw(recipient[1])
+            for _ in range(_MAX_DRAWS):
+                if not _is_compatible(donor, recipient):
+                    break
+                donor = draw(recipient[1])
+            donors.append((len(donors), recipient_id, *donor))
+
+    os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+    dbcon = sqlite3.connect(path)
+    try:
+        with dbcon:
+            dbcon.execute(
+                "CREATE TABLE recipients (id INTEGER PRIMARY KEY, blood_type TEXT, tissue_type INTEGER)"
+            )
+            dbcon.execute(
+                "CREATE TABLE donors (id INTEGER PRIMARY KEY, represents INTEGER, blood_type TEXT, tissue_type INTEGER)"
+            )
+            dbcon.executemany("INSERT INTO recipients VALUES (?, ?, ?)", recipients)
+            dbcon.executemany("INSERT INTO donors VALUES (?, ?, ?, ?)", donors)
+    finally:
+        dbcon.close()
+    return path
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(
+        description="Generate a synthetic transplant registry (.db)."
+    )
+    parser.add_argument("path", help="the database file to create")
+    parser.add_argument("--patients", type=int, required=True)
+    density = parser.add_mutually_exclusive_group()
+    density.add_argument("--tissue-types", type=int, default=10)
+    density.add_argument(
+        "--density", type=float, help="expected fraction of compatible pairs"
+    )
+    parser.add_argument("--tissue-correlation", type=float, default=0.0)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--overwrite", action="store_true")
+    args = parser.parse_args()
+    num_tissue_types = (
+        args.tissue_types
+        if args.density is None
+        else tissue_types_for_density(args.density)
+    )
+    generate_registry(
+        args.path,
+        args.patients,
+        num_tissue_types=num_tissue_types,
+        seed=args.seed,
+        tissue_correlation=args.tissue_correlation,
+        overwrite=args.overwrite,
+    )
+    print(f"Wrote {args.path} with {num_tissue_types} tissue types")
@@ -0,0 +1,160 @@
+"""
+Measure how the transplant solvers scale on generated registries of growing size.
+For every size, solver and database implementation, the model build (including
+loading the database), the solve and the verification are timed separately:
+
+    python scaling_benchmark.py --sizes 100 200 500 1000 --density 0.02 --csv scaling.csv
+
+Comparing `--databases sqlite cached` shows the speedup of the bulk-loading
+CachedTransplantDatabase over the reference SqliteTransplantDatabase.
+
+The registries are generated with `registry_generator.py` into `--registry-dir`
+and reused by later runs with the same parameters.
+"""
+
+import argparse
+import csv
+import math
+import os
+import time
+from typing import Any, Dict, Iterable, List, Optional
+
+from _cpsat_presets import PRESETS
+from _db_impl import CachedTransplantDatabase, SqliteTransplantDatabase
+from registry_generator import generate_registry, tissue_types_for_density
+from solution_assignment import AssignmentTransplantSolver
+from solution_basic import CrossoverTransplantSolver
+from solution_small_cycles import MAX_CYCLE_LEN, CycleLimitingCrossoverTransplantSolver
+from verification import SolutionVerifier
+
+REGISTRY_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "registries")
+SOLVERS = {
+    "basic": CrossoverTransplantSolver,
+    "small_cycles": CycleLimitingCrossoverTransplantSolver,
+    "assignment": AssignmentTransplantSolver,
+}
+DATABASES = {
+    "sqlite": SqliteTransplantDatabase,
+    "cached": CachedTransplantDatabase,
+}
+# the largest cycle allowed by each solver
+MAX_CYCLE_LENS = {"small_cycles": MAX_CYCLE_LEN}
+
+
+def registry_path(
+    registry_dir: str, size: int, num_tissue_types: int, correlation: float, seed: int
+) -> str:
+    """
+    Generate the registry with the given parameters, unless it already exists.
+    """
+    name = f"{size}_t{num_tissue_types}_c{correlation:g}_s{seed}.db"
+    path = os.path.join(registry_dir, name)
+    if not os.path.exists(path):
+        generate_registry(
+            path,
+            size,
+            num_tissue_types=num_tissue_types,
+            seed=seed,
+            tissue_correlation=correlation,
+        )
+    return path
+
+
+def run_scaling_benchmark(
+    registries: Iterable[str],
+    solvers: Iterable[str] = tuple(SOLVERS),
+    databases: Iterable[str] = ("cached",),
+    preset: str = "throughput",
+    timelimit: float = 60.0,
+    csv_path: Optional[str] = None,
+) -> List[Dict[str, Any]]:
+    """
+    Build, solve and verify every registry with every solver and database
+    implementation. The solve time is inf if the solver could not prove optimality
+    within the time limit.
+    """
+    rows = []
+    runs = [(name, db_name) for name in solvers for db_name in databases]
+    for path in registries:
+        for name, db_name in runs:
+            start = time.perf_counter()
+            database = DATABASES[db_name](path)
+            solver = SOLVERS[name](database, preset=preset)
+            built = time.perf_counter()
+            try:
+                solution = solver.optimize(timelimit)
+            except AssertionError:  # the exercise solvers assert optimality
+                solution = None
+            solved = time.perf_counter()
+            if solution is not None:
+                SolutionVerifier(database).verify(solution, MAX_CYCLE_LENS.get(name))
+            verified = time.perf_counter()
+            row = {
+                "registry": os.path.basename(path),
+                "patients": len(database.get_all_recipients()),
+                "solver": name,
+                "database": db_name,
+                "donations": math.nan if solution is None else len(solution.donations),
+                "build_time": built - start,
+                "solve_time": solved - built if solution is not None else math.inf,
+                "verify_time": verified - solved,
+            }
+            print(
+                f"{row['registry']:>28} {name:>14} {db_name:>6}: {row['donations']} donations,"
+                f" build {row['build_time']:.2f}s, solve {row['solve_time']:.2f}s,"
+                f" verify {row['verify_time']:.2f}s"
+            )
+            rows.append(row)
+    if csv_path is not None:
+        with open(csv_path, "w", newline="") as f:
+            writer = csv.DictWriter(f, fieldnames=list(rows[0]) if rows else [])
+            writer.writeheader()
+            writer.writerows(rows)
+    return rows
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--sizes", type=int, nargs="+", default=[50, 100, 200, 500])
+    density = parser.add_mutually_exclusive_group()
+    density.add_argument("--tissue-types", type=int, default=10)
+    density.add_argument(
+        "--density", type=float, help="expected fraction of compatible pairs"
+    )
+    parser.add_argument("--tissue-correlation", type=float, default=0.0)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument(
+        "--solvers", nargs="+", choices=list(SOLVERS), default=["basic", "small_cycles"]
+    )
+    parser.add_argument(
+        "--databases", nargs="+", choices=list(DATABASES), default=["cached"]
+    )
+    parser.add_argument("--preset", choices=list(PRESETS), default="throughput")
+    parser.add_argument("--timelimit", type=float, default=60.0)
+    parser.add_argument("--registry-dir", default=REGISTRY_DIR)
+    parser.add_argument("--csv", help="write the results to this CSV file")
+    args = parser.parse_args()
+
+    num_tissue_types = (
+        args.tissue_types
+        if args.density is None
+        else tissue_types_for_density(args.density)
+    )
+    registries = [
+        registry_path(
+            args.registry_dir,
+            size,
+            num_tissue_types,
+            args.tissue_correlation,
+            args.seed,
+        )
+        for size in args.sizes
+    ]
+    run_scaling_benchmark(
+        registries,
+        args.solvers,
+        args.databases,
+        args.preset,
+        args.timelimit,
+        args.csv,
+    )
@@ -0,0 +1,120 @@
+"""
+A polynomial-time engine for the crossover transplant problem without a limit on
+the cycle length.
+
+A solution is a set of disjoint cycles in the patient digraph, which has an arc
+from patient a to patient b if a partner donor of a is compatible with b, and we
+want to cover as many patients as possible. This maximum cycle cover is a
+minimum-cost perfect assignment of the patients as givers (left) to the patients
+as receivers (right):
+
+- an arc a -> b of the digraph assigns a to b with cost -1,
+- assigning a to itself with cost 0 means that a does not take part.
+
+Every assignment is a permutation, i.e., a set of cycles, and the cost is the
+negated number of covered patients. It is solved exactly by the combinatorial
+assignment algorithm of ortools (cost scaling) on array-based adjacency.
+"""
+
+import math
+from typing import List, Optional
+
+import numpy as np
+from _cpsat_telemetry import SearchTelemetry
+from data_schema import Donation, Donor, Solution
+from database import TransplantDatabase
+from ortools.graph.python.linear_sum_assignment import SimpleLinearSumAssignment
+from solution_basic import CrossoverTransplantSolver
+
+
+class AssignmentTransplantSolver:
+    """
+    Solves the crossover transplant problem (no cycle length limit) as an
+    assignment problem, with the same interface as `CrossoverTransplantSolver`.
+
+    Side constraints cannot be expressed in the assignment problem. For them, use
+    `cpsat_solver()` to get a (lazily built) `CrossoverTransplantSolver`, whose
+    model can be extended, and from then on `optimize()` solves that model instead.
+    """
+
+    def __init__(
+        self,
+        database: TransplantDatabase,
+        preset: str = "default",
+        telemetry: Optional[SearchTelemetry] = None,
+    ) -> None:
+        self.database = database
+        self._preset = preset
+        self._telemetry = telemetry
+        self._cpsat: Optional[CrossoverTransplantSolver] = None
+
+        self.recipients = database.get_all_recipients()
+        index = {rec: i for i, rec in enumerate(self.recipients)}
+        partner_donors = database.get_partner_donors_batch(self.recipients)
+        donors = [don for dons in partner_donors.values() for don in dons]
+        compatible = database.get_compatible_recipients_batch(donors)
+
+        # arcs (tail -> head), realized by the donor with index arc_donor
+        self.donors: List[Donor] = []
+        tails, heads, arc_donors = [], [], []
+        for rec, dons in partner_donors.items():
+            a = index[rec]
+            for don in dons:
+                self.donors.append(don)
+                for recip in compatible[don]:
+                    tails.append(a)
+                    heads.append(index[recip])
+                    arc_donors.append(len(self.donors) - 1)
+        self.tails = np.array(tails, dtype=np.int64)
+        self.heads = np.array(heads, dtype=np.int64)
+        self.arc_donors = np.array(arc_donors, dtype=np.int64)
+
+    def cpsat_solver(self) -> CrossoverTransplantSolver:
+        """
+        The CP-SAT model of the problem, to add side constraints to. After calling
+        this, `optimize()` uses CP-SAT.
+        """
+        if self._cpsat is None:
+            self._cpsat = CrossoverTransplantSolver(
+                self.database, preset=self._preset, telemetry=self._telemetry
+            )
+        return self._cpsat
+
+    def optimize(self, timelimit: float = math.inf) -> Solution:
+        """
+        Compute an optimal solution. The time limit only applies to CP-SAT.
+        """
+        if timelimit <= 0.0:
+            return Solution(donations=[])
+        if self._cpsat is not None:
+            return self._cpsat.optimize(timelimit)
+
+        n = len(self.recipients)
+        # keep only one arc per (tail, head) pair, self-loops replace the "not
+        # taking part" arcs of their patient
+        pairs = np.unique(self.tails * n + self.heads, return_index=True)[1]
+        tails, heads = self.tails[pairs], self.heads[pairs]
+        donors = self.arc_donors[pairs]
+        no_loop = np.setdiff1d(np.arange(n), tails[tails == heads])
+        assignment = SimpleLinearSumAssignment()
+        assignment.add_arcs_with_cost(
+            np.concatenate([tails, no_loop]),
+            np.concatenate([heads, no_loop]),
+            np.concatenate([np.full(len(tails), -1), np.zeros(len(no_loop))]).astype(
+                np.int64
+            ),
+        )
+        status = assignment.solve()
+        assert status == assignment.OPTIMAL
+
+        # the "not taking part" arcs are not in this map
+        donor_of_arc = dict(zip((tails * n + heads).tolist(), donors.tolist()))
+        donations = []
+        for a in range(n):
+            b = assignment.right_mate(a)
+            donor = donor_of_arc.get(a * n + b)
+            if donor is not None:
+                donations.append(
+                    Donation(donor=self.donors[donor], recipient=self.recipients[b])
+                )
+        return Solution(donations=donations)
@@ -1,16 +1,26 @@
 import math
+from typing import Optional
 
 import networkx as nx
+from _cpsat_presets import make_solver
+from _cpsat_telemetry import SearchTelemetry
 from data_schema import Donation, Solution
 from database import TransplantDatabase
-from ortools.sat.python.cp_model import FEASIBLE, OPTIMAL, CpModel, CpSolver
+from ortools.sat.python.cp_model import FEASIBLE, OPTIMAL, CpModel
 
 
 class CrossoverTransplantSolver:
-    def __init__(self, database: TransplantDatabase) -> None:
+    def __init__(
+        self,
+        database: TransplantDatabase,
+        preset: str = "default",
+        telemetry: Optional[SearchTelemetry] = None,
+    ) -> None:
         """
         Constructs a new solver instance, using the instance data from the given database instance.
         :param Database database: The organ donor/recipients database.
+        :param preset: The CP-SAT parameter preset, see `_cpsat_presets.PRESETS`.
+        :param telemetry: Optionally records the search progress.
         """
         self.database = database
         self.model = CpModel()
@@ -53,8 +63,10 @@ class CrossoverTransplantSolver:
                 t2.append(self.t[don,rec])
         self.model.Maximize(sum(t2))
 
-        self.solver = CpSolver()
-        self.solver.parameters.log_search_progress = True
+        self.solver = make_solver(preset)
+        if telemetry is not None:
+            telemetry.attach(self.solver)
+        self.telemetry = telemetry
 
 
     def optimize(self, timelimit: float = math.inf) -> Solution:
@@ -68,7 +80,7 @@ class CrossoverTransplantSolver:
         if timelimit < math.inf:
             self.solver.parameters.max_time_in_seconds = timelimit
         # TODO: Implement me!
-        status = self.solver.Solve(self.model)
+        status = self.solver.Solve(self.model, self.telemetry)
         assert status == OPTIMAL
 
         donos = []
@@ -1,37 +1,281 @@
 import math
+import time
 from collections import defaultdict
+from typing import Dict, List, Optional, Set, Tuple
 
-import networkx as nx
-from data_schema import Donation, Solution
+from _cpsat_presets import make_solver
+from _cpsat_telemetry import SearchTelemetry
+from data_schema import Donation, Donor, Solution
 from database import TransplantDatabase
-from ortools.sat.python.cp_model import FEASIBLE, OPTIMAL, CpModel, CpSolver
+from ortools.sat.python.cp_model import (
+    OPTIMAL,
+    CpModel,
+    CpSolverSolutionCallback,
+    IntVar,
+)
+
+MAX_CYCLE_LEN = 3
+# a guard for the "lazy" formulation, which can take many rounds on dense registries
+LAZY_MAX_ROUNDS = 1000
+
+
+def enumerate_short_cycles(
+    successors: List[List[int]], max_cycle_len: int = MAX_CYCLE_LEN
+) -> List[Tuple[int, ...]]:
+    """
+    Enumerate all directed cycles with at most max_cycle_len nodes in a digraph
+    given by its (indexed) successor lists. Every cycle is reported once, starting
+    at its smallest node. Self-loops are cycles of length 1.
+    """
+    successor_sets = [set(succ) for succ in successors]
+    cycles = []
+    for start in range(len(successors)):
+        # DFS over paths that start at `start` and only visit larger nodes
+        stack = [(start, (start,))]
+        while stack:
+            node, path = stack.pop()
+            if start in successor_sets[node]:
+                cycles.append(path)
+            if len(path) == max_cycle_len:
+                continue
+            for succ in successors[node]:
+                if succ > start and succ not in path:
+                    stack.append((succ, (*path, succ)))
+    return cycles
+
+
+class _SolutionCollector(CpSolverSolutionCallback):
+    """
+    Collects the successor of every giving patient in all solutions of a solve, and
+    forwards the solutions to the telemetry.
+    """
+
+    def __init__(
+        self, y: Dict[Tuple[int, int], IntVar], telemetry: Optional[SearchTelemetry]
+    ) -> None:
+        super().__init__()
+        self.y = y
+        self.telemetry = telemetry
+        self.successors: List[Dict[int, int]] = []
+
+    def on_solution_callback(self) -> None:
+        self.successors.append({a: b for (a, b), y in self.y.items() if self.Value(y)})
+        if self.telemetry is not None:
+            self.telemetry.add_solution(self.ObjectiveValue())
 
 
 class CycleLimitingCrossoverTransplantSolver:
-    def __init__(self, database: TransplantDatabase) -> None:
+    def __init__(
+        self,
+        database: TransplantDatabase,
+        formulation: str = "cycles",
+        preset: str = "default",
+        telemetry: Optional[SearchTelemetry] = None,
+        max_cycle_len: int = MAX_CYCLE_LEN,
+    ) -> None:
         """
         Constructs a new solver instance, using the instance data from the given database instance.
         :param Database database: The organ donor/recipients database.
+        :param formulation: "cycles" creates one variable per donation cycle of length at most
+            max_cycle_len, "donations" one variable per compatible donation (only for
+            max_cycle_len 3), "lazy" one variable per patient arc and adds constraints against
+            too long cycles only when a solution contains them. Use "cycles" in practice:
+            "lazy" needs many re-solves on dense registries (at most LAZY_MAX_ROUNDS).
+        :param preset: The CP-SAT parameter preset, see `_cpsat_presets.PRESETS`.
+        :param telemetry: Optionally records the search progress.
+        :param max_cycle_len: The maximum number of patients in a donation cycle.
         """
 
         self.database = database
+        self.formulation = formulation
+        if max_cycle_len < 1:
+            msg = "The maximum cycle length must be at least 1."
+            raise ValueError(msg)
+        self.max_cycle_len = max_cycle_len
         # TODO: Implement me!
         self.model = CpModel()
         # TODO: Implement me!
         self.donors = self.database.get_all_donors()
         self.recipients = self.database.get_all_recipients()
 
+        if formulation == "cycles":
+            self._build_cycle_model()
+        elif formulation == "donations":
+            if max_cycle_len != 3:
+                msg = "The 'donations' formulation only supports a maximum cycle length of 3."
+                raise ValueError(msg)
+            self._build_donation_model()
+        elif formulation == "lazy":
+            self._build_lazy_model()
+        else:
+            msg = f"Unknown formulation '{formulation}'!"
+            raise ValueError(msg)
+
+        self.solver = make_solver(preset)
+        if telemetry is not None:
+            telemetry.attach(self.solver)
+        self.telemetry = telemetry
+
+    def _build_arcs(self) -> List[List[int]]:
+        """
+        Every patient is a node, with an arc from patient a to patient b, if a partner
+        donor of a is compatible with b. Stores one such donor per arc in
+        `self.arc_donor` and returns the successor lists.
+        """
+        index = {rec: i for i, rec in enumerate(self.recipients)}
+        partner_donors = self.database.get_partner_donors_batch(self.recipients)
+        compatible = self.database.get_compatible_recipients_batch(self.donors)
+        # arc (a, b) -> a partner donor of a that can donate to b
+        self.arc_donor: Dict[Tuple[int, int], Donor] = {}
+        successors: List[List[int]] = [[] for _ in self.recipients]
+        for rec in self.recipients:
+            a = index[rec]
+            for don in partner_donors[rec]:
+                for recip in compatible[don]:
+                    b = index[recip]
+                    if (a, b) not in self.arc_donor:
+                        self.arc_donor[a, b] = don
+                        successors[a].append(b)
+        return successors
+
+    def _build_cycle_model(self) -> None:
+        """
+        A feasible solution is a set of node-disjoint cycles of length at most
+        max_cycle_len in the patient digraph, so we enumerate these cycles once and
+        select a subset of them.
+        """
+        successors = self._build_arcs()
+        self.cycles = enumerate_short_cycles(successors, self.max_cycle_len)
+        self.c = [self.model.NewBoolVar("") for _ in self.cycles]
+        #Constraint: every patient is in at most one selected cycle
+        cycles_of_patient = defaultdict(list)
+        for x, cycle in zip(self.c, self.cycles):
+            for a in cycle:
+                cycles_of_patient[a].append(x)
+        for xs in cycles_of_patient.values():
+            self.model.AddAtMostOne(xs)
+        #Objective: every patient in a cycle receives one organ
+        self.model.Maximize(sum(len(cycle) * x for x, cycle in zip(self.c, self.cycles)))
+
+    def _build_lazy_model(self) -> None:
+        """
+        A cycle cover model of the patient digraph: every patient gives along at most
+        one arc, and exactly if it receives along one. Too long cycles are not
+        forbidden up front, but cut off by `_add_path_cuts` when they occur.
+        """
+        successors = self._build_arcs()
+        self.y = {arc: self.model.NewBoolVar("") for arc in self.arc_donor}
+        incoming: List[List[IntVar]] = [[] for _ in self.recipients]
+        for a, succ in enumerate(successors):
+            for b in succ:
+                incoming[b].append(self.y[a, b])
+        for a, succ in enumerate(successors):
+            outgoing = [self.y[a, b] for b in succ]
+            self.model.AddAtMostOne(outgoing)
+            self.model.Add(sum(outgoing) == sum(incoming[a]))
+        self.model.Maximize(sum(self.y.values()))
+        self.cut_paths: Set[Tuple[int, ...]] = set()
+        self.num_cuts = 0
+        self.num_solves = 0
+
+    def _long_cycles(self, successor: Dict[int, int]) -> List[List[int]]:
+        """
+        The cycles with more than max_cycle_len patients in the permutation given by
+        the successor of every giving patient, found by a linear walk.
+        """
+        cycles = []
+        visited = set()
+        for start in successor:
+            if start in visited:
+                continue
+            cycle = []
+            a = start
+            while a not in visited:
+                visited.add(a)
+                cycle.append(a)
+                a = successor[a]
+            if len(cycle) > self.max_cycle_len:
+                cycles.append(cycle)
+        return cycles
+
+    def _add_path_cuts(self, cycle: List[int]) -> None:
+        """
+        A path of max_cycle_len arcs visits max_cycle_len + 1 patients and hence
+        cannot be part of a valid cycle. Forbid every such path along the cycle,
+        unless an earlier round already did.
+        """
+        k = self.max_cycle_len
+        closed = cycle + cycle[:k]
+        for i in range(len(cycle)):
+            path = tuple(closed[i : i + k + 1])
+            if path not in self.cut_paths:
+                self.cut_paths.add(path)
+                self.model.Add(sum(self.y[a, b] for a, b in zip(path, path[1:])) <= k - 1)
+                self.num_cuts += 1
+
+    def _optimize_lazy(
+        self, timelimit: float, max_rounds: int = LAZY_MAX_ROUNDS
+    ) -> Solution:
+        """
+        Solve, cut off the too long cycles of all solutions found, and re-solve until
+        the optimal solution has none. Dropping the long cycles of a solution leaves a
+        feasible one. The best of these hints the next solve and is returned once it
+        matches the upper bound. Like the other formulations, this asserts that the
+        solution is optimal: if the time limit or max_rounds is hit first, the best
+        solution found is kept in `self.best_solution`, but not returned.
+        The "cycles" formulation is much faster and the one to use in practice.
+        """
+        deadline = time.monotonic() + timelimit
+        best: Dict[int, int] = {}
+        optimal = False
+        for _ in range(max_rounds):
+            remaining = deadline - time.monotonic()
+            if remaining <= 0.0:
+                break
+            if remaining < math.inf:
+                self.solver.parameters.max_time_in_seconds = remaining
+            collector = _SolutionCollector(self.y, self.telemetry)
+            status = self.solver.Solve(self.model, collector)
+            self.num_solves += 1
+            long_cycles: List[List[int]] = []
+            for successor in collector.successors:
+                for cycle in self._long_cycles(successor):
+                    long_cycles.append(cycle)
+                    for a in cycle:
+                        del successor[a]
+                if len(successor) > len(best):
+                    best = successor
+            if status != OPTIMAL:
+                break  # the time is up
+            if len(best) >= self.solver.BestObjectiveBound():
+                optimal = True
+                break
+            for cycle in long_cycles:
+                self._add_path_cuts(cycle)
+            self.model.ClearHints()
+            for (a, b), y in self.y.items():
+                self.model.AddHint(y, int(best.get(a) == b))
+        self.best_solution = Solution(
+            donations=[
+                Donation(donor=self.arc_donor[a, b], recipient=self.recipients[b])
+                for a, b in best.items()
+            ]
+        )
+        assert optimal, "The lazy formulation did not prove optimality in time."
+        return self.best_solution
+
+    def _build_donation_model(self) -> None:
         #Variables: Try only var if compatible
         self.t = {}
         for don in self.donors:
             for rec in self.database.get_compatible_recipients(don):
                 self.t[don,rec] = self.model.NewBoolVar(f"t_{don}{rec}")
-        
+
         #Constraint: donor can only donate once
         for don in self.donors:
             recips = self.database.get_compatible_recipients(don)
             self.model.Add(sum(self.t[don,rec] for rec in recips) <= 1)
-        
+
         #Constraint: recipient can only receive one organ
         for rec in self.recipients:
             dons = self.database.get_compatible_donors(rec)
@@ -49,14 +293,14 @@ class CycleLimitingCrossoverTransplantSolver:
             for partner in partner_donors:
                 for recip in self.database.get_compatible_recipients(partner):
                     outgoing.append(Donation(donor=partner, recipient=recip))
-            
+
             for compat_donor in self.database.get_compatible_donors(rec):
                 incoming.append(Donation(donor=compat_donor, recipient=rec))
 
             for out_dono in outgoing:
                 for inc_dono in incoming:
                     third_donos = []
-                    
+
                     #case if it is 2-cycle
                     if out_dono.recipient == self.database.get_partner_recipient(inc_dono.donor):
                         continue
@@ -64,30 +308,37 @@ class CycleLimitingCrossoverTransplantSolver:
                     for partner in self.database.get_partner_donors(out_dono.recipient):
                         if partner in self.database.get_compatible_donors(self.database.get_partner_recipient(inc_dono.donor)):
                             third_donos.append(self.t[partner, self.database.get_partner_recipient(inc_dono.donor)])
-                    
+
                     inc_dono_t = self.t[inc_dono.donor, inc_dono.recipient]
                     out_dono_t = self.t[out_dono.donor, out_dono.recipient]
                     self.model.Add(inc_dono_t + out_dono_t <= sum(third_donos) + 1)
-                        
+
         #Objective
         self.model.Maximize(sum(self.t[d,r] for d in self.donors for r in self.database.get_compatible_recipients(d)))
-        
-        self.solver = CpSolver()
-        self.solver.parameters.log_search_progress = True
 
+    def _extract_donations(self) -> List[Donation]:
+        donos = []
+        if self.formulation == "cycles":
+            for x, cycle in zip(self.c, self.cycles):
+                if self.solver.Value(x) == 1:
+                    for a, b in zip(cycle, cycle[1:] + cycle[:1]):
+                        donos.append(Donation(donor=self.arc_donor[a, b], recipient=self.recipients[b]))
+            return donos
+        for don in self.donors:
+            for rec in self.database.get_compatible_recipients(don):
+                if self.solver.Value(self.t[don,rec]) == 1:
+                    donos.append(Donation(donor=don, recipient=rec))
+        return donos
 
     def optimize(self, timelimit: float = math.inf) -> Solution:
         if timelimit <= 0.0:
             return Solution(donations=[])
+        if self.formulation == "lazy":
+            return self._optimize_lazy(timelimit)
         if timelimit < math.inf:
             self.solver.parameters.max_time_in_seconds = timelimit
         # TODO: Implement me!
-        status = self.solver.Solve(self.model)
+        status = self.solver.Solve(self.model, self.telemetry)
         assert status == OPTIMAL
 
-        donos = []
-        for don in self.donors:
-            for rec in self.database.get_compatible_recipients(don):
-                if self.solver.Value(self.t[don,rec]) == 1:
-                    donos.append(Donation(donor=don, recipient=rec))
-        return Solution(donations=donos)
+        return Solution(donations=self._extract_donations())
@@ -0,0 +1,108 @@
+from collections import Counter
+from typing import Dict, List, Optional, Set
+
+from data_schema import Donation, Donor, Recipient, Solution
+from database import TransplantDatabase
+
+
+class SolutionVerifier:
+    """
+    Checks solutions for a transplant database. The compatibilities and partner
+    relations are loaded from the database once, such that every rule can be
+    checked with set and dict lookups in linear time in the size of the solution.
+    """
+
+    def __init__(self, database: TransplantDatabase) -> None:
+        recipients = database.get_all_recipients()
+        self.compatible_donors: Dict[Recipient, Set[Donor]] = {
+            recipient: set(donors)
+            for recipient, donors in database.get_compatible_donors_batch(
+                recipients
+            ).items()
+        }
+        self.partner_recipient: Dict[Donor, Recipient] = {
+            donor: recipient
+            for recipient, donors in database.get_partner_donors_batch(
+                recipients
+            ).items()
+            for donor in donors
+        }
+
+    def verify(
+        self, solution: Solution, max_cycle_len: Optional[int] = None
+    ) -> List[int]:
+        """
+        Check the validity of the solution datastructure itself,
+        and the logical validity under the constraints of the problem.
+        More specifically:
+        - The solution must not be None and it must be of the correct solution type.
+        - Donations must be between compatible Donors and Recipients.
+        - Donors donate atmost once.
+        - Recipients receive atmost once.
+        - Every receiving Recipient has exactly one donating associated Donor.
+        - Donors only donate if their associated Recipient receives.
+        - Donation cycles have at most max_cycle_len patients (if given).
+        Raises a ValueError if a check fails and returns the lengths of the
+        donation cycles otherwise.
+        """
+        if solution is None:
+            msg = "The solution is None!"
+            raise ValueError(msg)
+        if not isinstance(solution, Solution):
+            msg = "The solution must be of type 'Solution'."
+            raise ValueError(msg)
+        donations = solution.donations
+        if not all(isinstance(don, Donation) for don in donations):
+            msg = "The solution list must be made of entries of type 'Donation'!"
+            raise ValueError(msg)
+        for donation in donations:
+            compatible = self.compatible_donors.get(donation.recipient, ())
+            if donation.donor not in compatible:
+                msg = "The solution contains donations between incompatible donors and patients!"
+                raise ValueError(msg)
+            if donation.donor not in self.partner_recipient:
+                msg = (
+                    f"Donor {donation.donor.id} donates, but has no associated patient!"
+                )
+                raise ValueError(msg)
+        if len({don.donor for don in donations}) != len(donations):
+            msg = "There is at least one donor who occurs multiple times in the solution list!"
+            raise ValueError(msg)
+        receiving = {don.recipient for don in donations}
+        if len(receiving) != len(donations):
+            msg = "There is at least one patient who occurs multiple times in the solution list!"
+            raise ValueError(msg)
+
+        # the patient represented by each donating donor
+        donating_for = Counter(self.partner_recipient[don.donor] for don in donations)
+        for patient in receiving:
+            if donating_for[patient] != 1:
+                msg = f"Every patient that receives a donation needs exactly one representative donor to make a donation to somebody else! Total count for patient {patient.id}: {donating_for[patient]}"
+                raise ValueError(msg)
+        for donation in donations:
+            assoc_patient = self.partner_recipient[donation.donor]
+            if assoc_patient not in receiving:
+                msg = f"Donor {donation.donor.id} donates, but their associated patient ({assoc_patient.id}) does not receive a donation!"
+                raise ValueError(msg)
+
+        # Every patient now gives and receives exactly one organ, so the donations
+        # form a permutation of the patients, whose cycles we can simply walk.
+        successor = {
+            self.partner_recipient[don.donor]: don.recipient for don in donations
+        }
+        cycle_lengths = []
+        visited: Set[Recipient] = set()
+        for start in successor:
+            if start in visited:
+                continue
+            length = 0
+            patient = start
+            while patient not in visited:
+                visited.add(patient)
+                patient = successor[patient]
+                length += 1
+            cycle_lengths.append(length)
+            if max_cycle_len is not None and length > max_cycle_len:
+                msg = f"The solution contains a donation cycle longer than {max_cycle_len}"
+                raise ValueError(msg)
+        return cycle_lengths
@@ -1,9 +1,10 @@
 import os
 
-from _alglab_utils import CHECK, main, mandatory_testcase
+from _alglab_utils import CHECK, FAIL, main, mandatory_testcase
 from _db_impl import SqliteTransplantDatabase, TransplantDatabase
-from data_schema import Donation, Solution
+from data_schema import Solution
 from solution_basic import CrossoverTransplantSolver
+from verification import SolutionVerifier
 
 INSTANCE_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "instances")
 
@@ -30,58 +31,12 @@ def solve_instance_and_check_solution(db_name: str, solution_score: int):
 
 def check_solution_validity(solution: Solution, database: TransplantDatabase):
     """
-    Check the validity of the solution datastructure itself,
-    and the logical validity under the constraints of the problem.
-    More specifically:
-    - The solution must not be None and it must be of the correct solution type.
-    - Donations must be between compatible Donors and Recipients.
-    - Donors donate atmost once.
-    - Recipients receive atmost once.
-    - Donors only donate if their associated Recipient receives.
+    Check the validity of the solution, see `SolutionVerifier.verify`.
     """
-    CHECK(solution is not None, "The solution is None!")
-    CHECK(isinstance(solution, Solution), "The solution must be of type 'Solution'.")
-    solution = solution.donations
-    CHECK(
-        all(isinstance(don, Donation) for don in solution),
-        "The solution list must be made of entries of type 'Donation'!",
-    )
-    # check that donations are between compatible donor+patient
-    for donation in solution:
-        patient = donation.recipient
-        compatible_donors = database.get_compatible_donors(patient)
-        CHECK(
-            donation.donor in compatible_donors,
-            "The solution contains donations between incompatible donors and patients!",
-        )
-
-    # check that every donor only donates once
-    CHECK(
-        len(set(don.donor for don in solution)) == len(solution),
-        "There is at least one donor who occurs multiple times in the solution list!",
-    )
-    # check that every patient only receives once
-    CHECK(
-        len(set(don.recipient for don in solution)) == len(solution),
-        "There is at least one patient who occurs multiple times in the solution list!",
-    )
-    # check that for every receiving recipient, exactly one associated donor donates
-    for donation in solution:
-        patient = donation.recipient
-        associated_donors = set(database.get_partner_donors(patient))
-        associated_donors &= set(don.donor for don in solution)
-        CHECK(
-            len(associated_donors) == 1,
-            f"Every patient that receives a donation needs exactly one representative donor to make a donation to somebody else! Total count for patient {patient.id}: {len(associated_donors)}",
-        )
-    # check that no donor donates, whose associated patient does not receive a donation
-    for donation in solution:
-        donor = donation.donor
-        assoc_patient = database.get_partner_recipient(donor)
-        CHECK(
-            any(don.recipient == assoc_patient for don in solution),
-            f"Donor {donor.id} donates, but their associated patient ({assoc_patient.id}) does not receive a donation!",
-        )
+    try:
+        SolutionVerifier(database).verify(solution)
+    except ValueError as e:
+        FAIL(str(e))
 
 
 @mandatory_testcase(max_runtime_s=30)
@@ -3,7 +3,7 @@ from typing import List
 
 import matplotlib.pyplot as plt
 import networkx as nx
-from _db_impl import SqliteTransplantDatabase
+from _db_impl import CachedTransplantDatabase
 from data_schema import Donation, Donor, Recipient
 from database import TransplantDatabase
 from solution_basic import CrossoverTransplantSolver
@@ -127,7 +127,7 @@ if __name__ == "__main__":
     args = parser.parse_args()
 
     # sqlite database
-    db: TransplantDatabase = SqliteTransplantDatabase("./instances/20.db")
+    db: TransplantDatabase = CachedTransplantDatabase("./instances/20.db")
 
     # create solver based on arguments
     if args.basic:
@@ -1,6 +1,11 @@
 from .bnb import BnBSearch
 from .bnb_nodes import BnBNode, NodeFactory
-from .branching_strategy import BranchingStrategy
+from .branching_strategy import (
+    BranchingStrategy,
+    CriticalItemBranching,
+    PseudocostBranching,
+    StrongBranching,
+)
 from .heuristics import Heuristics
 from .instance import Instance, Item
 from .relaxation import (
@@ -12,16 +17,19 @@ from .search_strategy import SearchStrategy
 from .solutions import SolutionSet
 
 __all__ = [
-    "Instance",
-    "Item",
     "BnBNode",
-    "NodeFactory",
-    "SearchStrategy",
-    "SolutionSet",
-    "BranchingStrategy",
     "BnBSearch",
-    "RelaxationSolver",
     "BranchingDecisions",
+    "BranchingStrategy",
+    "CriticalItemBranching",
     "FractionalSolution",
     "Heuristics",
+    "Instance",
+    "Item",
+    "NodeFactory",
+    "PseudocostBranching",
+    "RelaxationSolver",
+    "SearchStrategy",
+    "SolutionSet",
+    "StrongBranching",
 ]
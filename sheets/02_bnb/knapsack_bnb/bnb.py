@@ -75,6 +75,7 @@ class BnBSearch:
         # branch on a non-integer variable
         for decisions in self.branching_strategy.make_branching_decisions(node):
             child = self.node_factory.create_child(node, decisions)
+            self.branching_strategy.on_child_created(node, child)
             self.search_strategy.enqueue(child)
             child.status = NodeStatus.ENQUEUED
         node.status = NodeStatus.BRANCHED
@@ -2,6 +2,7 @@ import typing
 from abc import ABC, abstractmethod
 
 from .bnb_nodes import BnBNode, BranchingDecisions
+from .relaxation import FractionalSolution, RelaxationSolver
 
 
 class BranchingStrategy(ABC):
@@ -17,4 +18,241 @@ class BranchingStrategy(ABC):
         Abstract method for making branching decisions.
         """
 
+    def on_child_created(self, parent: BnBNode, child: BnBNode) -> None:  # noqa: B027
+        """
+        Report the creation of a child node from the decisions of this strategy.
+        Strategies that learn from the search (e.g., pseudocosts) can override this.
+        This optional hook does nothing by default, so it is not abstract.
+        """
+
+
+def _unfixed_indices(node: BnBNode) -> typing.List[int]:
+    return [i for i, x in enumerate(node.branching_decisions) if x is None]
+
+
+def _branched_index(parent: BnBNode, child: BnBNode) -> typing.Optional[int]:
+    """
+    Return the index of the item that was fixed when going from parent to child.
+    """
+    for i, (x_parent, x_child) in enumerate(
+        zip(parent.branching_decisions, child.branching_decisions)
+    ):
+        if x_parent is None and x_child is not None:
+            return i
+    return None
 
+
+class CriticalItemBranching(BranchingStrategy):
+    """
+    Branch on the critical item, i.e., the item that is only taken fractionally
+    by the relaxation. For the greedy relaxation, this is the first item (by
+    value/weight ratio) that no longer fits completely into the knapsack.
+    """
+
+    def make_branching_decisions(
+        self, node: BnBNode
+    ) -> typing.Iterable[BranchingDecisions]:
+        selection = node.relaxed_solution.selection
+        unfixed = _unfixed_indices(node)
+        assert unfixed, "All items are already fixed."
+        split_idx = next(
+            (i for i in unfixed if selection[i] != int(selection[i])), unfixed[0]
+        )
+        yield from node.branching_decisions.split_on(split_idx)
+
+
+class PseudocostBranching(BranchingStrategy):
+    """
+    Branch on the item with the highest estimated bound degradation. For every item,
+    the average degradation of the relaxation value per unit of change is learned
+    from the children created so far (the pseudocost), separately for fixing the item
+    to 0 (down) and to 1 (up). Items without observations use the average pseudocost
+    of all items.
+    """
+
+    def __init__(self, score_factor: typing.Optional[float] = None) -> None:
+        """
+        score_factor: Weight of the larger of the two estimated degradations in the
+            score. The smaller one is weighted by 1-score_factor, favouring items that
+            improve the bound in both children. If None, the product of the two
+            degradations is used as score instead.
+        """
+        self.score_factor = score_factor
+        # item index -> [sum of degradations per unit, number of observations]
+        self._down: typing.Dict[int, typing.List[float]] = {}
+        self._up: typing.Dict[int, typing.List[float]] = {}
+
+    def _score(self, down_gain: float, up_gain: float) -> float:
+        if self.score_factor is None:
+            return max(down_gain, 1e-6) * max(up_gain, 1e-6)
+        return (1 - self.score_factor) * min(
+            down_gain, up_gain
+        ) + self.score_factor * max(down_gain, up_gain)
+
+    @staticmethod
+    def _average(costs: typing.Dict[int, typing.List[float]]) -> float:
+        total = sum(c for c, _ in costs.values())
+        count = sum(n for _, n in costs.values())
+        return total / count if count else 1.0
+
+    def num_observations(self, item_index: int) -> int:
+        """
+        Number of observations of the less observed direction of the item.
+        """
+        return min(
+            self._down.get(item_index, [0.0, 0])[1],
+            self._up.get(item_index, [0.0, 0])[1],
+        )
+
+    def pseudocost(self, item_index: int) -> typing.Tuple[float, float]:
+        """
+        Return the learned (down, up) pseudocosts of the item.
+        """
+        down = self._down.get(item_index)
+        up = self._up.get(item_index)
+        return (
+            down[0] / down[1] if down else self._average(self._down),
+            up[0] / up[1] if up else self._average(self._up),
+        )
+
+    def _estimate(self, node: BnBNode, item_index: int) -> float:
+        x = node.relaxed_solution.selection[item_index]
+        down_cost, up_cost = self.pseudocost(item_index)
+        return self._score(x * down_cost, (1 - x) * up_cost)
+
+    def _candidates(self, node: BnBNode) -> typing.List[int]:
+        unfixed = _unfixed_indices(node)
+        assert unfixed, "All items are already fixed."
+        return unfixed
+
+    def make_branching_decisions(
+        self, node: BnBNode
+    ) -> typing.Iterable[BranchingDecisions]:
+        split_idx = max(self._candidates(node), key=lambda i: self._estimate(node, i))
+        yield from node.branching_decisions.split_on(split_idx)
+
+    def _observe(
+        self,
+        parent: FractionalSolution,
+        item_index: int,
+        value: int,
+        child: FractionalSolution,
+    ) -> None:
+        """
+        Record the degradation per unit of change of the relaxation from fixing the
+        item to the value (0 or 1).
+        """
+        x = parent.selection[item_index]
+        if value == 0:
+            change, costs = x, self._down
+        else:
+            change, costs = 1 - x, self._up
+        if change <= 0:
+            return  # the relaxation did not change, nothing to learn
+        parent_value = parent.value()
+        if child.is_fractionally_feasible():
+            degradation = parent_value - child.value()
+        else:
+            degradation = parent_value  # the whole branch is lost
+        entry = costs.setdefault(item_index, [0.0, 0])
+        entry[0] += max(degradation, 0.0) / change
+        entry[1] += 1
+
+    def on_child_created(self, parent: BnBNode, child: BnBNode) -> None:
+        item_index = _branched_index(parent, child)
+        if item_index is None:
+            return
+        self._observe(
+            parent.relaxed_solution,
+            item_index,
+            child.branching_decisions[item_index],
+            child.relaxed_solution,
+        )
+
+
+class StrongBranching(PseudocostBranching):
+    """
+    Evaluate the relaxations of the children of the most promising candidates and
+    branch on the item with the highest actual bound degradation.
+
+    If a reliability threshold is given, this becomes reliability branching: only
+    items whose pseudocosts are based on fewer observations than the threshold are
+    evaluated, all other items are rated by their pseudocosts.
+    """
+
+    def __init__(
+        self,
+        relaxation: RelaxationSolver,
+        max_candidates: int = 8,
+        reliability: typing.Optional[int] = None,
+        score_factor: typing.Optional[float] = 1 / 6,
+    ) -> None:
+        """
+        relaxation: The relaxation solver used to evaluate the children.
+        max_candidates: Maximal number of items whose children are evaluated per node.
+            The candidates closest to 0.5 in the relaxation are evaluated first.
+        reliability: Number of observations after which the pseudocosts of an item are
+            trusted instead of evaluating its children. None means always evaluate.
+        """
+        super().__init__(score_factor=score_factor)
+        self.relaxation = relaxation
+        self.max_candidates = max_candidates
+        self.reliability = reliability
+        self.num_evaluations = 0
+        # the node of the last branching decision and the items evaluated there
+        self._node: typing.Optional[BnBNode] = None
+        self._evaluated: typing.Set[int] = set()
+
+    def _evaluate(self, node: BnBNode, item_index: int) -> float:
+        """
+        Solve the relaxations of both children of the item. Their degradations also
+        seed the pseudocosts, such that evaluated items become reliable.
+        """
+        self.num_evaluations += 1
+        self._evaluated.add(item_index)
+        parent = node.relaxed_solution
+        gains = []
+        for value, decisions in enumerate(
+            node.branching_decisions.split_on(item_index)
+        ):
+            child = self.relaxation.solve(parent.instance, decisions)
+            self._observe(parent, item_index, value, child)
+            if child.is_fractionally_feasible():
+                gains.append(max(parent.value() - child.value(), 0.0))
+            else:
+                gains.append(parent.value())
+        return self._score(*gains)
+
+    def on_child_created(self, parent: BnBNode, child: BnBNode) -> None:
+        # the children of evaluated items were already observed by _evaluate
+        if parent is self._node and _branched_index(parent, child) in self._evaluated:
+            return
+        super().on_child_created(parent, child)
+
+    def _is_reliable(self, item_index: int) -> bool:
+        return (
+            self.reliability is not None
+            and self.num_observations(item_index) >= self.reliability
+        )
+
+    def make_branching_decisions(
+        self, node: BnBNode
+    ) -> typing.Iterable[BranchingDecisions]:
+        self._node = node
+        self._evaluated = set()
+        selection = node.relaxed_solution.selection
+        candidates = sorted(
+            self._candidates(node), key=lambda i: abs(selection[i] - 0.5)
+        )
+        scores = {}
+        num_evaluated = 0
+        for i in candidates:
+            if self._is_reliable(i):
+                scores[i] = self._estimate(node, i)
+            elif num_evaluated < self.max_candidates:
+                scores[i] = self._evaluate(node, i)
+                num_evaluated += 1
+        if not scores:
+            scores = {i: self._estimate(node, i) for i in candidates}
+        split_idx = max(scores, key=lambda i: scores[i])
+        yield from node.branching_decisions.split_on(split_idx)
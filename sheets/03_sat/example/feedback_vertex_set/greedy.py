@@ -1,18 +1,105 @@
+import heapq
+import typing
+
 import networkx as nx
-from util import Node, Set, find_cycle
+from util import Node, Set
 
 
-def greedy_fvs(graph: nx.Graph) -> Set[Node]:
+def greedy_fvs(graph: nx.Graph, local_search: bool = True) -> Set[Node]:
     """
     This method generates a greedy solution to the Feedback Vertex Set problem.
-    The algorithm iteratively identifies and "breaks open" remaining cycles in the graph.
-    The utilized greedy strategy always removes the vertex with the highest degree from a
-    found cycle, as the chance for breaking open more than one cycle increases.
+    Vertices of degree at most one are in no cycle, so they are pruned iteratively.
+    Every remaining vertex has degree at least two, and the greedy strategy always
+    removes the vertex with the highest degree, as the chance for breaking open more
+    than one cycle increases. A priority queue over the degrees makes this run in
+    O((V+E) log V) instead of searching a cycle after every removal.
+    The optional local search afterwards removes redundant vertices from the solution.
     """
-    graph = graph.copy()
-    feedback_vertex_set = set()
-    while (cycle := find_cycle(graph)) is not None:
-        highest_degree_vertex = max(cycle, key=lambda v: graph.degree(v))
-        graph.remove_node(highest_degree_vertex)
-        feedback_vertex_set.add(highest_degree_vertex)
-    return feedback_vertex_set
+    nodes = list(graph.nodes)
+    index = {v: i for i, v in enumerate(nodes)}
+    # adjacency with multiplicity, such that parallel edges of multigraphs are cycles
+    adjacency: typing.List[typing.List[int]] = [[] for _ in nodes]
+    self_loops = set()
+    for u, v in graph.edges():
+        if u == v:  # a self-loop can only be broken by its vertex
+            self_loops.add(index[u])
+        else:
+            adjacency[index[u]].append(index[v])
+            adjacency[index[v]].append(index[u])
+
+    removed = [i in self_loops for i in range(len(nodes))]
+    degree = [0] * len(nodes)
+    for i, neighbors in enumerate(adjacency):
+        if not removed[i]:
+            degree[i] = sum(1 for j in neighbors if not removed[j])
+
+    def remove(i: int) -> None:
+        # remove vertex i and prune the vertices of degree at most one it leaves behind
+        stack = [i]
+        removed[i] = True
+        while stack:
+            j = stack.pop()
+            for k in adjacency[j]:
+                if removed[k]:
+                    continue
+                degree[k] -= 1
+                if degree[k] <= 1:
+                    removed[k] = True
+                    stack.append(k)
+                else:
+                    heapq.heappush(queue, (-degree[k], k))
+
+    queue: typing.List[typing.Tuple[int, int]] = []
+    for i in range(len(nodes)):
+        if not removed[i] and degree[i] <= 1:
+            remove(i)
+    queue = [(-degree[i], i) for i in range(len(nodes)) if not removed[i]]
+    heapq.heapify(queue)
+    selected = []  # in the order of selection
+    while queue:
+        neg_degree, i = heapq.heappop(queue)
+        if removed[i] or -neg_degree != degree[i]:
+            continue  # outdated entry
+        selected.append(i)
+        remove(i)
+
+    if local_search:
+        selected = _remove_redundant(adjacency, self_loops, selected)
+    return {nodes[i] for i in self_loops.union(selected)}
+
+
+def _remove_redundant(
+    adjacency: typing.List[typing.List[int]],
+    self_loops: typing.Set[int],
+    selected: typing.List[int],
+) -> typing.List[int]:
+    """
+    Put selected vertices back into the forest if they do not close a cycle, i.e., if
+    all their edges go to different trees. The trees are kept in a union-find
+    structure, so this takes near-linear time. Returns the remaining selection.
+    """
+    in_solution = self_loops.union(selected)
+    parent = list(range(len(adjacency)))
+
+    def find(i: int) -> int:
+        while parent[i] != i:
+            parent[i] = parent[parent[i]]
+            i = parent[i]
+        return i
+
+    for i, neighbors in enumerate(adjacency):
+        if i not in in_solution:
+            for j in neighbors:
+                if j not in in_solution:
+                    parent[find(i)] = find(j)
+    # the vertices selected last were chosen with the least information
+    remaining = []
+    for i in reversed(selected):
+        trees = [find(j) for j in adjacency[i] if j not in in_solution]
+        if len(trees) == len(set(trees)):
+            in_solution.remove(i)
+            for tree in trees:
+                parent[tree] = i
+        else:
+            remaining.append(i)
+    return remaining[::-1]
@@ -0,0 +1,75 @@
+"""
+Reduction rules for the Feedback Vertex Set problem, which shrink the graph to a
+kernel before it is handed to the SAT-based solver:
+
+- A vertex with a self-loop is in every FVS. It is selected and removed.
+- A vertex with degree at most one is in no cycle and can be removed.
+- A vertex with degree two can be contracted, i.e., replaced by an edge between its
+  two neighbors: every cycle through it also passes one of its neighbors, which is at
+  least as good a choice. This can create parallel edges (cycles of length two) and,
+  for two parallel edges, self-loops, so the kernel is a multigraph. More than two
+  parallel edges are redundant.
+- A bridge is in no cycle and can be removed.
+
+After removing the bridges, the kernel falls apart into its 2-edge-connected
+components, which share no vertices and can be solved independently (splitting into
+biconnected components instead would not be exact, as they share articulation
+points). Every vertex of the kernel is a vertex of the original graph, so a solution
+for the kernel together with the selected vertices is a solution for the graph.
+
+FeedbackVertexSetSolverSAT applies the rules by default (`kernelize=True`), and
+KernelizedFeedbackVertexSetSolver solves the components in parallel processes.
+"""
+
+import typing
+
+import networkx as nx
+from util import Node
+
+
+def _reduce(
+    graph: nx.MultiGraph, queue: typing.List[Node], selected: typing.Set[Node]
+) -> None:
+    """
+    Apply the vertex rules to the queued vertices (and to the neighbors of every
+    changed vertex) until none applies anymore.
+    """
+    while queue:
+        v = queue.pop()
+        if v not in graph:
+            continue
+        neighbors = [u for _, u in graph.edges(v)]
+        if v in neighbors:  # self-loop
+            selected.add(v)
+        elif len(neighbors) == 2:
+            u, w = neighbors
+            if u == w or graph.number_of_edges(u, w) < 2:
+                graph.add_edge(u, w)
+        elif len(neighbors) > 2:
+            continue
+        graph.remove_node(v)
+        queue.extend(u for u in neighbors if u != v)
+
+
+def kernelize(
+    graph: nx.Graph,
+) -> typing.Tuple[typing.Set[Node], typing.List[nx.MultiGraph]]:
+    """
+    Return the vertices that are in some optimal FVS and the independent components
+    of the remaining kernel. An optimal FVS of the graph consists of the returned
+    vertices and an optimal FVS of every component.
+    """
+    kernel = nx.MultiGraph(graph)
+    selected: typing.Set[Node] = set()
+    queue = list(kernel.nodes)
+    while True:
+        _reduce(kernel, queue, selected)
+        bridges = list(nx.bridges(kernel))
+        if not bridges:
+            break
+        kernel.remove_edges_from(bridges)
+        queue = [v for bridge in bridges for v in bridge]
+    components = [
+        kernel.subgraph(nodes).copy() for nodes in nx.connected_components(kernel)
+    ]
+    return selected, components
@@ -0,0 +1,161 @@
+"""
+A parallel portfolio for the Feedback Vertex Set problem: several combinations of
+search strategy and SAT backend run in separate processes on the same graph. They
+share their bounds through two integers in shared memory, such that every process
+skips the values of k that another process already decided. Improved solutions are
+sent to the main process through a queue, which stops all processes as soon as the
+bounds meet.
+
+On platforms that start worker processes with 'spawn' (Windows, macOS), it has to be
+used from within an `if __name__ == "__main__":` block.
+"""
+
+import logging
+import multiprocessing
+import queue
+import typing
+
+import networkx as nx
+from _timer import Timer
+from greedy import greedy_fvs
+from solver import FeedbackVertexSetSolverSAT, SearchStrategy
+from util import Node
+
+# (search strategy, PySAT backend)
+DEFAULT_PORTFOLIO: typing.Tuple[typing.Tuple[SearchStrategy, str], ...] = (
+    (SearchStrategy.SEQUENTIAL_DOWN, "Minicard"),
+    (SearchStrategy.BINARY_SEARCH, "Glucose4"),
+    (SearchStrategy.SEQUENTIAL_UP, "Cadical153"),
+)
+
+
+class _SharedBounds:
+    """
+    The best bounds of all processes, and a queue for the messages to the main process.
+    """
+
+    def __init__(self, context, upper_bound: int) -> None:
+        self.lower = context.Value("i", 0)
+        self.upper = context.Value("i", upper_bound)
+        self.messages = context.Queue()
+
+
+class _PortfolioMember(FeedbackVertexSetSolverSAT):
+    """
+    A FeedbackVertexSetSolverSAT that publishes its bounds and imports the bounds of
+    the other processes before every SAT call. An imported upper bound comes without
+    its solution, which the main process already received.
+    """
+
+    def __init__(
+        self,
+        graph: nx.Graph,
+        bounds: _SharedBounds,
+        logger: typing.Optional[logging.Logger] = None,
+        sat_solver: str = "Minicard",
+    ) -> None:
+        super().__init__(graph, logger=logger, sat_solver=sat_solver)
+        self._bounds = bounds
+
+    def _add_solution(self, solution: typing.Set):
+        super()._add_solution(solution)
+        with self._bounds.upper.get_lock():
+            if len(solution) < self._bounds.upper.value:
+                self._bounds.upper.value = len(solution)
+                self._bounds.messages.put(("solution", solution))
+
+    def _add_lower_bound(self, lower_bound: int):
+        super()._add_lower_bound(lower_bound)
+        with self._bounds.lower.get_lock():
+            if lower_bound > self._bounds.lower.value:
+                self._bounds.lower.value = lower_bound
+                self._bounds.messages.put(("lower_bound", lower_bound))
+
+    def _import_bounds(self):
+        if self._bounds.lower.value > self.lower_bound:
+            super()._add_lower_bound(self._bounds.lower.value)
+        self.upper_bound = min(self.upper_bound, self._bounds.upper.value)
+
+
+def _run_member(
+    graph: nx.Graph,
+    bounds: _SharedBounds,
+    search_strategy: SearchStrategy,
+    sat_solver: str,
+    time_limit: float,
+) -> None:
+    try:
+        logger = logging.getLogger(f"FVS-Portfolio-{search_strategy}-{sat_solver}")
+        member = _PortfolioMember(graph, bounds, logger, sat_solver)
+        member.solve(time_limit, search_strategy)
+    finally:
+        bounds.messages.put(("done", None))
+
+
+class PortfolioFeedbackVertexSetSolver:
+    """
+    Runs a FeedbackVertexSetSolverSAT for every (search strategy, SAT backend) pair of
+    the portfolio in its own process, and returns the best solution once one of them
+    is proven optimal (or the time is up).
+    """
+
+    def __init__(
+        self,
+        graph: nx.Graph,
+        portfolio: typing.Iterable[
+            typing.Tuple[SearchStrategy, str]
+        ] = DEFAULT_PORTFOLIO,
+        logger: typing.Optional[logging.Logger] = None,
+    ) -> None:
+        self._logger = logger or logging.getLogger("FVS-Portfolio")
+        self.graph = graph
+        self.portfolio = list(portfolio)
+        self.best_solution = greedy_fvs(graph)
+        self.upper_bound = len(self.best_solution)
+        self.lower_bound = 0
+
+    def _handle_message(self, kind: str, value: typing.Any) -> None:
+        if kind == "solution" and len(value) < self.upper_bound:
+            self._logger.info("A solution of size %d was found!", len(value))
+            self.best_solution = value
+            self.upper_bound = len(value)
+        elif kind == "lower_bound" and value > self.lower_bound:
+            self._logger.info("Increased lower bound to %d.", value)
+            self.lower_bound = value
+
+    def solve(self, time_limit: float = 900) -> typing.Set[Node]:
+        """
+        Finds the smallest FVS on the given graph.
+        """
+        timer = Timer(time_limit)
+        context = multiprocessing.get_context()
+        bounds = _SharedBounds(context, self.upper_bound)
+        processes = [
+            context.Process(
+                target=_run_member,
+                args=(self.graph, bounds, strategy, sat_solver, time_limit),
+                daemon=True,
+            )
+            for strategy, sat_solver in self.portfolio
+        ]
+        for process in processes:
+            process.start()
+        running = len(processes)
+        try:
+            while running and self.lower_bound < self.upper_bound:
+                try:
+                    kind, value = bounds.messages.get(timeout=max(timer.remaining(), 0))
+                except queue.Empty:
+                    self._logger.info("Timeout reached.")
+                    break
+                if kind == "done":
+                    running -= 1
+                else:
+                    self._handle_message(kind, value)
+        finally:
+            # the bounds met, or the time is up: stop the remaining searches
+            for process in processes:
+                if process.is_alive():
+                    process.terminate()
+                process.join()
+        return self.best_solution
@@ -1,11 +1,14 @@
 import logging
 import math
 import typing
+from concurrent.futures import ProcessPoolExecutor
 from enum import Enum
 
 import networkx as nx  # pip install networkx
 from _timer import Timer
 from greedy import greedy_fvs
+from kernelization import kernelize as kernelize_graph
+from pysat.card import ITotalizer
 from pysat.solvers import Solver as SATSolver  # pip install python-sat
 from util import Node
 
@@ -47,52 +50,164 @@ class _NodeVars:
         return {self.node(x)[0] for x in model if x in self._reverse}
 
 
+class _ResidualGraph:
+    """
+    An array-based adjacency of the graph over the node variables. Cycles are searched
+    in the graph without a set of removed nodes, which is only given as a mask over the
+    variables. Thus, the lazy constraint loop never copies the graph.
+    Parallel edges of multigraphs (e.g., kernels) are cycles of length two.
+    """
+
+    def __init__(self, graph: nx.Graph, node_vars: _NodeVars) -> None:
+        self.num_vars = graph.number_of_nodes()
+        # index 0 is unused, as there is no variable 0
+        self.adjacency: typing.List[typing.List[int]] = [
+            [] for _ in range(self.num_vars + 1)
+        ]
+        for u, v in graph.edges():
+            x, y = node_vars.x(u), node_vars.x(v)
+            self.adjacency[x].append(y)
+            if x != y:
+                self.adjacency[y].append(x)
+
+    def removed_mask(self, model: typing.List[int]) -> bytearray:
+        """
+        Mask the nodes selected in the given model (solution for a SAT-formula).
+        """
+        removed = bytearray(self.num_vars + 1)
+        for x in model:
+            if 0 < x <= self.num_vars:
+                removed[x] = 1
+        return removed
+
+    def cycle_basis(
+        self, removed: typing.Optional[bytearray] = None
+    ) -> typing.List[typing.List[int]]:
+        """
+        Return a cycle basis (as lists of variables) of the graph without the removed
+        nodes: the fundamental cycles of a BFS spanning forest, one per non-tree edge.
+        """
+        if removed is None:
+            removed = bytearray(self.num_vars + 1)
+        adjacency = self.adjacency
+        parent = [0] * (self.num_vars + 1)
+        depth = [-1] * (self.num_vars + 1)
+        cycles = []
+        for root in range(1, self.num_vars + 1):
+            if removed[root] or depth[root] >= 0:
+                continue
+            depth[root] = 0
+            queue = [root]
+            for x in queue:  # the queue grows while iterating
+                skipped_parent = False
+                for y in adjacency[x]:
+                    if removed[y]:
+                        continue
+                    if y == parent[x] and not skipped_parent:  # the edge to the parent
+                        skipped_parent = True
+                    elif depth[y] < 0:  # a new tree edge
+                        depth[y] = depth[x] + 1
+                        parent[y] = x
+                        queue.append(y)
+                    elif y == x:  # self-loop
+                        cycles.append([x])
+                    elif y == parent[x]:  # a parallel edge
+                        cycles.append([x, y])
+                    elif (depth[y], y) < (depth[x], x):
+                        # a non-tree edge, seen from its later endpoint
+                        cycles.append(self._tree_cycle(x, y, parent, depth))
+        return cycles
+
+    @staticmethod
+    def _tree_cycle(
+        x: int, y: int, parent: typing.List[int], depth: typing.List[int]
+    ) -> typing.List[int]:
+        # walk up from both endpoints until the paths meet
+        left, right = [x], [y]
+        while depth[x] > depth[y]:
+            x = parent[x]
+            left.append(x)
+        while depth[y] > depth[x]:
+            y = parent[y]
+            right.append(y)
+        while x != y:
+            x, y = parent[x], parent[y]
+            left.append(x)
+            right.append(y)
+        right.pop()  # the common ancestor is already in left
+        return left + right[::-1]
+
+
 class FeedbackVertexSetDecisionVariant:
     """
     A SAT-based solver for checking if a given graph contains a Feedback Vertex Set of size k.
     Iteratively used for the optimization to find the smallest feasible k.
+    The limit k is not part of the formula, but selected by an assumption on the outputs
+    of a totalizer (a cardinality encoding that counts the selected nodes). Thus, k can be
+    changed in both directions, while the solver keeps all cycle constraints and learned
+    clauses.
     """
 
     def __init__(
-        self, graph: nx.Graph, k: int, logger: typing.Optional[logging.Logger] = None
+        self,
+        graph: nx.Graph,
+        k: int,
+        logger: typing.Optional[logging.Logger] = None,
+        sat_solver: str = "Minicard",
     ) -> None:
         # Logs are easier to analyze and mange than prints.
         self._logger = logger or logging.getLogger("FVS-SAT")
         self.graph = graph
         self.k = k
         self._logger.info("Building SAT formula for FVS of size %d.", k)
-        self.solver = SATSolver("Minicard")
+        # any PySAT backend, e.g., "Minicard", "Glucose4" or "Cadical153"
+        self.solver = SATSolver(sat_solver)
         self.node_vars = _NodeVars(graph)
+        self.residual_graph = _ResidualGraph(graph, self.node_vars)
+        # totalizer.rhs[i] is implied if more than i nodes are selected
+        self._totalizer = ITotalizer(
+            lits=[self.node_vars.x(v) for v in graph.nodes], ubound=max(k, 0)
+        )
+        self.solver.append_formula(self._totalizer.cnf.clauses)
         self.limit_k(k)
-        self._find_and_handle_cycle_basis(graph)
+        self._find_and_handle_cycle_basis()
         self._logger.info("SAT formula built.")
 
-    def _find_and_handle_cycle_basis(self, subgraph: nx.Graph) -> int:
+    def _find_and_handle_cycle_basis(
+        self, removed: typing.Optional[bytearray] = None
+    ) -> int:
         """
-        For a given graph (likely a subgraph of self.graph), find the cycle basis,
-        add clauses to select at least one node per cycle. A cycle basis, calculable
-        in polynomial time, is a set of combinable cycles to construct any graph cycle.
-        This method returns the found cycle basis size.
+        For the graph without the removed nodes (a mask over the node variables), find
+        the cycle basis, add clauses to select at least one node per cycle. A cycle basis,
+        calculable in polynomial time, is a set of combinable cycles to construct any
+        graph cycle. This method returns the found cycle basis size.
         """
-        cycle_list = nx.cycle_basis(subgraph)
+        cycle_list = self.residual_graph.cycle_basis(removed)
         for cycle in cycle_list:
             # at least one node per cycle must be selected (positive variable assignment)
-            self.solver.add_clause([self.node_vars.x(v) for v in cycle])
+            self.solver.add_clause(cycle)
         self._logger.info("Added %d cycle constraints.", len(cycle_list))
         return len(cycle_list)
 
     def limit_k(self, k: int):
         """
-        Update the model in order to enforce a new limit of k selected nodes.
+        Set a new limit of k selected nodes. It can be smaller or larger than before.
         """
-        if k > self.k:
-            # Increasing k is not possible without resetting the solver.
-            msg = "The new value for k must be smaller than the old value."
-            raise ValueError(msg)
-
-        self.solver.add_atmost([self.node_vars.x(v) for v in self.graph.nodes], k)
+        if k >= len(self._totalizer.rhs) and k < self.graph.number_of_nodes():
+            # extend the totalizer to count up to k
+            self._totalizer.increase(ubound=k)
+            # clauses[-0:] would be the whole encoding again
+            if self._totalizer.nof_new > 0:
+                new_clauses = self._totalizer.cnf.clauses[-self._totalizer.nof_new :]
+                self.solver.append_formula(new_clauses)
         self.k = k
 
+    def _assumptions(self) -> typing.List[int]:
+        # "not more than k nodes" (nothing to assume if all nodes may be selected)
+        if self.k >= self.graph.number_of_nodes():
+            return []
+        return [-self._totalizer.rhs[self.k]]
+
     def solve(self, time_limit: float = 900) -> typing.Optional[typing.Set[Node]]:
         """
         Determines if a feedback vertex set of <= k vertices exists, returning it or 'None'.
@@ -103,29 +218,30 @@ class FeedbackVertexSetDecisionVariant:
         """
         # As long as the SAT solver returns "satisfiable"
         timer = Timer(time_limit)
-        while self.solver.solve():
+        while self.solver.solve(assumptions=self._assumptions()):
             timer.check()  # throws TimeoutError if time is up
             # Retrieve the solution from the solver.
             model = self.solver.get_model()
             assert model is not None
-            feedback_nodes = self.node_vars.get_node_selection(model)
-            # get subgraph induced by the graph excluding the feedback nodes
-            subgraph = self.graph.copy()
-            subgraph.remove_nodes_from(feedback_nodes)
+            # mask the feedback nodes instead of copying the graph without them
+            removed = self.residual_graph.removed_mask(model)
             # Add constraint to forbid found cycle and solve again.
             # This approach is efficient as the solver continues from its stop point.
             # Fewer constraints lead to simpler, faster solved models despite potential exponential constraints.
-            num_cycles = self._find_and_handle_cycle_basis(subgraph)
+            num_cycles = self._find_and_handle_cycle_basis(removed)
             if num_cycles != 0:
                 # The resulting graph contained cycles. Resolve with the newly added constraints.
                 continue
 
             # The remaining graph contains no cycles. A valid solution was found!
             self._logger.info("Found FVS of size %d.", self.k)
-            return feedback_nodes
+            return self.node_vars.get_node_selection(model)
         # The SAT-solver proved the formula to be infeasible.
         # This proves that there exists no FVS of size k.
         self._logger.info("No FVS of size %d exists.", self.k)
+        if self.k < self.graph.number_of_nodes():
+            # keep this lower bound for all further values of k
+            self.solver.add_clause([self._totalizer.rhs[self.k]])
         return None
 
 
@@ -154,16 +270,33 @@ class FeedbackVertexSetSolverSAT:
     """
 
     def __init__(
-        self, graph: nx.Graph, logger: typing.Optional[logging.Logger] = None
+        self,
+        graph: nx.Graph,
+        logger: typing.Optional[logging.Logger] = None,
+        sat_solver: str = "Minicard",
+        kernelize: bool = True,
     ) -> None:
         # Logs are easier to analyze and mange than prints.
         self._logger = logger or logging.getLogger("FVS-Optimizer")
         self.graph = graph
-        self.best_solution = greedy_fvs(graph)
+        # The SAT formula is only built for the kernel, see kernelization.py.
+        # The vertices selected by the reductions are part of every solution.
+        self.selected: typing.Set[Node] = set()
+        kernel = graph
+        if kernelize:
+            self.selected, components = kernelize_graph(graph)
+            kernel = nx.union_all(components) if components else nx.MultiGraph()
+            self._logger.info(
+                "Reduced %d vertices to %d selected ones and a kernel of %d vertices.",
+                graph.number_of_nodes(),
+                len(self.selected),
+                kernel.number_of_nodes(),
+            )
+        self.best_solution = self.selected.union(greedy_fvs(kernel))
         self.upper_bound = len(self.best_solution)
-        self.lower_bound = 0
+        self.lower_bound = len(self.selected)
         self.sat_formula = FeedbackVertexSetDecisionVariant(
-            graph, k=len(self.best_solution)
+            kernel, k=self.upper_bound - len(self.selected), sat_solver=sat_solver
         )
 
     def _add_solution(self, solution: typing.Set):
@@ -172,13 +305,18 @@ class FeedbackVertexSetSolverSAT:
             self._logger.info("A solution of size %d was found!", k)
             self.upper_bound = k
             self.best_solution = solution
-            self.sat_formula.limit_k(k)
+            self.sat_formula.limit_k(k - len(self.selected))
 
     def _add_lower_bound(self, lower_bound: int):
         if lower_bound > self.lower_bound:
             self._logger.info("Increased lower bound to %d.", lower_bound)
         self.lower_bound = max(self.lower_bound, lower_bound)
 
+    def _import_bounds(self):
+        """
+        A hook to learn bounds found elsewhere, e.g., by the other solvers of a portfolio.
+        """
+
     def _get_next_k(self, search_strategy: SearchStrategy) -> int:
         # The next k to try.
         if search_strategy == SearchStrategy.SEQUENTIAL_UP:
@@ -197,13 +335,11 @@ class FeedbackVertexSetSolverSAT:
         return k
 
     def _solve_for_k(self, k: int, timer: Timer) -> typing.Optional[typing.Set[Node]]:
-        # Check if <=k is feasible.
-        if k <= self.sat_formula.k:  # Reuse the SAT-formula if possible
-            self.sat_formula.limit_k(k)
-        else:
-            # If we increase k, we need to reset the model.
-            self.sat_formula = FeedbackVertexSetDecisionVariant(self.graph, k=k)
-        return self.sat_formula.solve(timer.remaining())
+        # Check if <=k is feasible. The SAT-formula, including all cycle constraints
+        # found so far, is reused for every k.
+        self.sat_formula.limit_k(k - len(self.selected))
+        kernel_fvs = self.sat_formula.solve(timer.remaining())
+        return None if kernel_fvs is None else self.selected.union(kernel_fvs)
 
     def solve(
         self,
@@ -216,6 +352,7 @@ class FeedbackVertexSetSolverSAT:
         self._logger.info("Starting search with upper bound %d.", self.upper_bound)
         timer = Timer(time_limit)  # rough time limit for the whole algorithm
         try:
+            self._import_bounds()
             while self.lower_bound < self.upper_bound:
                 timer.check()  # throws TimeoutError if time is up
                 # Tighten the constraints on the model to check
@@ -226,6 +363,63 @@ class FeedbackVertexSetSolverSAT:
                     self._add_lower_bound(k + 1)
                 else:  # New solution found!
                     self._add_solution(k_limited_fvs)
+                self._import_bounds()
         except TimeoutError:
             self._logger.info("Timeout reached.")
         return self.best_solution
+
+
+def _solve_component(
+    component: nx.MultiGraph, time_limit: float, search_strategy: SearchStrategy
+) -> typing.Set[Node]:
+    # the component is already a kernel
+    return FeedbackVertexSetSolverSAT(component, kernelize=False).solve(
+        time_limit, search_strategy
+    )
+
+
+class KernelizedFeedbackVertexSetSolver:
+    """
+    Applies the reduction rules and solves every component of the kernel with its own
+    FeedbackVertexSetSolverSAT, in parallel processes unless max_workers is 1.
+
+    On platforms that start worker processes with 'spawn' (Windows, macOS), it has to
+    be used from within an `if __name__ == "__main__":` block.
+    """
+
+    def __init__(
+        self,
+        graph: nx.Graph,
+        max_workers: typing.Optional[int] = None,
+        logger: typing.Optional[logging.Logger] = None,
+    ) -> None:
+        self._logger = logger or logging.getLogger("FVS-Kernel")
+        self.graph = graph
+        self.max_workers = max_workers
+        self.selected, self.components = kernelize_graph(graph)
+        self._logger.info(
+            "Reduced %d vertices to %d selected ones and %d components with %d vertices.",
+            graph.number_of_nodes(),
+            len(self.selected),
+            len(self.components),
+            sum(c.number_of_nodes() for c in self.components),
+        )
+
+    def solve(
+        self,
+        time_limit: float = 900,
+        search_strategy: SearchStrategy = SearchStrategy.SEQUENTIAL_DOWN,
+    ) -> typing.Set[Node]:
+        """
+        Finds the smallest FVS on the given graph. The time limit applies to every
+        component.
+        """
+        # large components first, such that they do not end up last in the pool
+        components = sorted(self.components, key=len, reverse=True)
+        args = [(c, time_limit, search_strategy) for c in components]
+        if self.max_workers == 1 or len(components) <= 1:
+            solutions = [_solve_component(*arg) for arg in args]
+        else:
+            with ProcessPoolExecutor(self.max_workers) as pool:
+                solutions = list(pool.map(_solve_component, *zip(*args)))
+        return self.selected.union(*solutions)